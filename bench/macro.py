@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# See LICENSE file for copyright and license details.
+
+'''
+Macro benchmark: generate the report described by the example
+configuration script, from start to finish, a number of times
+
+Nothing is downloaded from the Internet, rotd is pointed, with
+$ROTD_MIRROR, at a local HTTP server that serves the recorded
+responses in bench/data. $HOME and $XDG_CACHE_HOME are set to
+empty temporary directories, so the user's files are neither
+used nor modified. Each run is first made with an empty cache
+(cold) and then again with the cache the first run left (warm).
+
+With -l, pdflatex is replaced by bench/bin/pdflatex, so that
+the time spent in TeX is not measured. With -f, the report is
+written as html, markdown, or text instead of as a PDF, and
+pdflatex is not run at all.
+
+Fortune files and gpg(1) are used if they are installed, and the
+solar section is generated if solar-python is installed; these
+affect the numbers, so compare runs on the same system.
+
+Usage: bench/macro.py [-l] [-j] [-n runs] [-t date] [-f format]
+'''
+
+import os, sys, time, json, shutil, tempfile, threading, statistics
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH)
+
+def serve(directory):
+    '''
+    Start an HTTP server, in a background thread, that serves a directory
+    
+    @param   directory:str  The directory to serve
+    @return  :str           The URL of the server
+    '''
+    import functools, http.server
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        def log_message(self, *args):
+            pass
+    handler = functools.partial(Handler, directory = directory)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    return 'http://127.0.0.1:%i' % server.server_address[1]
+
+def run(env, date, output):
+    '''
+    Generate the example report once
+    
+    @param   env:dict<str, str>  The environment
+    @param   date:str            The date to generate the report for
+    @param   output:str          The file to write the report to
+    @return  :dict               The wall-clock time of the run, and the
+                                 time spent per kind of profile entry
+    '''
+    import subprocess
+    cmd = [sys.executable, '%s/src/__main__.py' % ROOT, '-p', '-t', date, '-c', '%s/example' % ROOT, output]
+    start = time.monotonic()
+    status = subprocess.run(cmd, env = env, cwd = ROOT, stdin = subprocess.DEVNULL,
+                            stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL).returncode
+    rc = { 'total' : time.monotonic() - start }
+    if status != 0:
+        raise Exception('rotd exited with value %i' % status)
+    with open(output + '.profile.json', 'rb') as file:
+        profile = json.loads(file.read().decode('utf-8'))
+    for entry in profile['entries']:
+        if entry['kind'] == 'plugin':
+            key = entry['name']
+        elif entry['kind'] == 'spawn':
+            key = 'spawn ' + entry['name']
+        else:
+            key = entry['kind']
+        rc[key] = rc.get(key, 0) + entry['wall']
+    return rc
+
+def main(args):
+    runs, date, stub_latex, as_json, ext = 5, '2024-06-21', False, False, 'pdf'
+    while len(args) > 0:
+        if args[0] in ('-n', '-t', '-f') and len(args) > 1:
+            if args[0] == '-n':
+                runs = int(args[1])
+            elif args[0] == '-f':
+                ext = FORMAT_EXTENSIONS[args[1]]
+            else:
+                date = args[1]
+            args = args[2:]
+        elif args[0] in ('-l', '-j'):
+            stub_latex = stub_latex or args[0] == '-l'
+            as_json = as_json or args[0] == '-j'
+            args = args[1:]
+        else:
+            print(__doc__.strip().split('\n')[-1], file = sys.stderr)
+            return 1
+
+    tempdir = tempfile.mkdtemp(prefix = 'rotd-bench.')
+    try:
+        env = dict(os.environ)
+        env['ROTD_MIRROR'] = serve('%s/data' % BENCH)
+        env['HOME'] = '%s/home' % tempdir
+        env['XDG_CACHE_HOME'] = '%s/cache' % tempdir
+        env.pop('XDG_CONFIG_HOME', None)
+        if stub_latex:
+            env['PATH'] = '%s/bin:%s' % (BENCH, env.get('PATH', '/usr/bin:/bin'))
+        os.makedirs('%s/.config' % env['HOME'])
+        import importlib.util
+        if importlib.util.find_spec('solar_python') is not None:
+            with open('%s/.config/geolocation' % env['HOME'], 'wb') as file:
+                file.write(b'59.33 18.07\n')
+
+        results = { 'cold' : [], 'warm' : [] }
+        for _ in range(runs):
+            shutil.rmtree(env['XDG_CACHE_HOME'], ignore_errors = True)
+            shutil.rmtree('%s/.var' % env['HOME'], ignore_errors = True)
+            results['cold'].append(run(env, date, '%s/cold.%s' % (tempdir, ext)))
+            shutil.rmtree('%s/.var' % env['HOME'], ignore_errors = True)
+            results['warm'].append(run(env, date, '%s/warm.%s' % (tempdir, ext)))
+    finally:
+        shutil.rmtree(tempdir, ignore_errors = True)
+
+    report = {}
+    for cache, samples in results.items():
+        keys = sorted(set(key for sample in samples for key in sample), key = lambda key : (key != 'total', key))
+        for key in keys:
+            values = [sample.get(key, 0) for sample in samples]
+            report['%s %s' % (cache, key)] = { 'min'    : min(values)
+                                             , 'median' : statistics.median(values)
+                                             }
+    if as_json:
+        print(json.dumps({ 'runs' : runs, 'date' : date, 'stub_latex' : stub_latex, 'format' : ext,
+                           'results' : report }, indent = 1))
+    else:
+        width = max(len(key) for key in report)
+        print('%-*s  %10s  %10s' % (width, '', 'min (ms)', 'median (ms)'))
+        for key, value in report.items():
+            print('%-*s  %10.1f  %10.1f' % (width, key, value['min'] * 1000, value['median'] * 1000))
+    return 0
+
+# The output file extension for each format rotd's -f accepts
+FORMAT_EXTENSIONS = { 'pdf' : 'pdf', 'html' : 'html', 'markdown' : 'md', 'text' : 'txt' }
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# See LICENSE file for copyright and license details.
+
+'''
+Micro benchmarks: time plugin functions, that do not use the network
+or other programs, on synthetic workloads of increasing size
+
+The workloads are generated with a fixed seed, and the time zone is
+set to UTC, so that each run measures the same work. Each benchmark
+is repeated, and the fastest and the median time per call is printed.
+The Solar benchmarks are skipped if solar-python is not installed,
+and elevations_range is skipped if NumPy is not installed.
+
+Usage: bench/micro.py [-j] [-r repeat] [pattern]
+'''
+
+import os, sys, time, json, random, timeit, statistics
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH)
+sys.path.insert(0, '%s/src' % ROOT)
+
+os.environ['TZ'] = 'UTC'
+time.tzset()
+
+def synthetic_events(n):
+    '''
+    Generate events for `events.filter_events`
+    
+    @param   n:int                  The number of events
+    @return  :list<(str, str)>      Half recurring and half fixed events
+    '''
+    rng = random.Random(n)
+    year = time.gmtime().tm_year
+    rc = []
+    for i in range(n):
+        mon, mday = rng.randint(1, 12), rng.randint(1, 28)
+        if i % 2 == 0:
+            rc.append(('Event %i' % i, '%02i-%02i' % (mon, mday)))
+        else:
+            rc.append(('Event %i' % i, '%i-%02i-%02i' % (year + rng.randint(-1, 1), mon, mday)))
+    return rc
+
+def synthetic_leap_seconds(n):
+    '''
+    Generate a leapsec.dat file for `leapsec.parse_leap_seconds`
+    
+    @param   n:int  The number of announcements
+    @return  :str   The file
+    '''
+    rc = ''
+    for i in range(n):
+        year, mon = 1972 + i // 2, ('JAN', 'JUL')[i % 2]
+        rc += ' %i %s  1 =JD 2441317.5  TAI-UTC=  %i.0       S + (MJD - 41317.) X 0.0      S\n' % (year, mon, 10 + i)
+    return rc
+
+def synthetic_text(n):
+    '''
+    Generate text, with characters that must be escaped, for `latex.escape`
+    
+    @param   n:int  The number of characters
+    @return  :str   The text
+    '''
+    rng = random.Random(n)
+    return ''.join(rng.choice('abcdefghij klmnop\\{}$&#^_~%<>|"\'\n') for _ in range(n))
+
+def benchmarks():
+    '''
+    Get all benchmarks
+    
+    @return  :list<(name:str, size:int, setup:()→(()→void))>
+                     The benchmarks, `setup` creates the workload
+                     and returns the function to time
+    '''
+    import events, latex, leapsec, summertime, wotd, xkcd, tempfile
+    rc = []
+    for n in (10, 100, 1000, 10000):
+        rc.append(('events.filter_events', n, lambda n = n : (lambda x = synthetic_events(n) : events.filter_events(x, 30))))
+    def cold(function, *args):
+        events.compiled_calendars.clear()
+        return function(*args)
+    rc.append(('events.swedish_holidays', 1, lambda : (lambda : cold(events.swedish_holidays))))
+    rc.append(('events.swedish_events', 1, lambda : (lambda : cold(events.swedish_events))))
+    for n in (1, 10, 100):
+        rc.append(('events.calendar_events', n, lambda n = n : (lambda : cold(lambda : list(events.calendar_events(
+            events.SWEDISH_HOLIDAYS + events.SWEDISH_COMMON_EVENTS + events.SWEDISH_OTHER_EVENTS, 2000, 2000 + n - 1))))))
+    for n in (100, 10000, 1000000):
+        rc.append(('latex.escape', n, lambda n = n : (lambda x = synthetic_text(n) : latex.escape(x))))
+    def build(n):
+        doc = latex.Document(latex.documentclass('memoir'))
+        for i in range(n):
+            if i % 100 == 0:
+                doc.section(latex.sectionx('Section %i' % i))
+            doc += latex.ln('Event %i' % i)
+        return str(doc)
+    for n in (100, 10000):
+        rc.append(('latex.Document', n, lambda n = n : (lambda : build(n))))
+    with open('%s/data/oceandata.sci.gsfc.nasa.gov/Ancillary/LUTs/modis/leapsec.dat' % BENCH, 'rb') as file:
+        recorded = file.read().decode('utf-8')
+    rc.append(('leapsec.parse_leap_seconds', len(recorded.split('\n')) - 1,
+               lambda : (lambda : leapsec.parse_leap_seconds(recorded))))
+    for n in (100, 1000):
+        rc.append(('leapsec.parse_leap_seconds', n, lambda n = n : (lambda x = synthetic_leap_seconds(n) : leapsec.parse_leap_seconds(x))))
+    table = leapsec.LeapSecondTable.parse(recorded)
+    rc.append(('LeapSecondTable.tai_utc_offset', 1, lambda : (lambda : table.tai_utc_offset(1.5e9))))
+    rc.append(('LeapSecondTable.next_leap_second', 1, lambda : (lambda : table.next_leap_second(0))))
+    for lang in ('en', 'sv'):
+        with open('%s/data/%s' % (BENCH, wotd.WOTD_URLS[lang].split('://', 1)[1]), 'rb') as file:
+            page = file.read().decode('utf-8')
+        rc.append(('wotd.WOTD_EXTRACTORS[%r]' % lang, len(page), lambda page = page, lang = lang : (lambda : wotd.WOTD_EXTRACTORS[lang](page))))
+    for n in (100, 3000, 30000):
+        seen = xkcd.SeenComics('%s/xkcd.%i.seen' % (tempfile.gettempdir(), n))
+        for i in range(n):
+            seen.add(i)
+        rc.append(('SeenComics.next_unseen', n, lambda seen = seen, n = n : (lambda : seen.next_unseen(n))))
+    zone = summertime.TimeZone.lookup('Europe/Stockholm')
+    rc.append(('TimeZone.is_dst', 1, lambda : (lambda : zone.is_dst(1.5e9))))
+    rc.append(('TimeZone.transitions', 1, lambda : (lambda : zone.transitions(1.5e9, 31 * 24 * 60 * 60, 1))))
+    rc.append(('summertime.summer_time_events', 1, lambda : (lambda : summertime.summer_time_events(30, 1))))
+    try:
+        import solar_python, solar
+    except ImportError:
+        return rc
+    sol = solar.Solar(59.33, 18.07)
+    def uncached(function, *args):
+        solar.solar_cache.clear()
+        return function(*args)
+    rc.append(('Solar.elevations', 1, lambda : (lambda : uncached(sol.elevations, 0))))
+    rc.append(('Solar.lengths', 1, lambda : (lambda x = sol.elevations(0), y = sol.elevations(1) : sol.lengths(x, y))))
+    rc.append(('Solar.golden_hour', 1, lambda : (lambda : uncached(sol.golden_hour, 0))))
+    rc.append(('Solar.blue_hour', 1, lambda : (lambda : uncached(sol.blue_hour, 0))))
+    rc.append(('Solar.next_equinox', 1, lambda : sol.next_equinox))
+    for n in (1, 30, 365):
+        rc.append(('Solar.elevations (%i times)' % n, n, lambda n = n : (lambda : [uncached(sol.elevations, i) for i in range(n)])))
+    try:
+        import numpy
+    except ImportError:
+        return rc
+    for n in (1, 30, 365):
+        rc.append(('Solar.elevations_range', n, lambda n = n : (lambda : sol.elevations_range(0, n))))
+    return rc
+
+def main(args):
+    repeat, pattern, as_json = 5, '', False
+    while len(args) > 0:
+        if args[0] == '-r' and len(args) > 1:
+            repeat, args = int(args[1]), args[2:]
+        elif args[0] == '-j':
+            as_json, args = True, args[1:]
+        elif not args[0].startswith('-') and len(args) == 1:
+            pattern, args = args[0], []
+        else:
+            print(__doc__.strip().split('\n')[-1], file = sys.stderr)
+            return 1
+    results = []
+    for name, size, setup in benchmarks():
+        if pattern not in name:
+            continue
+        timer = timeit.Timer(setup())
+        number, _ = timer.autorange()
+        times = [t / number for t in timer.repeat(repeat, number)]
+        results.append({ 'name' : name, 'size' : size, 'min' : min(times), 'median' : statistics.median(times) })
+        if not as_json:
+            print('%-32s  %8i  %12.2f µs  %12.2f µs' % (name, size, results[-1]['min'] * 1e6, results[-1]['median'] * 1e6))
+            sys.stdout.flush()
+    if as_json:
+        print(json.dumps({ 'repeat' : repeat, 'results' : results }, indent = 1))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,15 +1,17 @@
 #!/usr/bin/env python3
 # See LICENSE file for copyright and license details.
 
-import os, sys, time
+import os, sys, time, threading
 
-global spawn, write, LIBEXEC
+global spawn, spawn_many, defer, write, cachedir, cached_section, pdflatex, latex_passes, pdf_cache_size
 
-LIBEXEC = os.getcwd() + ('/..' if os.getcwd().endswith('/src') else '') + '/libexec'
 #%%%sys.path.insert(0, '%%PLUGINPATH%%')
 
 argv0 = 'rotd' if len(sys.argv) == 0 else sys.argv[0]
 
+# The plugins that are installed with rotd
+PLUGINS = ('events', 'fortune', 'gnupg', 'latex', 'leapsec', 'net', 'solar', 'summertime', 'wotd', 'xkcd')
+
 def spawn(*cmd, successful_exits = [0], abort_timer = 0, get_stdout = False):
     '''
     Spawn a process without a stdin
@@ -24,64 +26,472 @@ def spawn(*cmd, successful_exits = [0], abort_timer = 0, get_stdout = False):
                                             a file name to which to redirect stdout
     @return  :str?                          The process's output to stdout, if `get_stdout`
     '''
-    close_this = None
-    if isinstance(get_stdout, str):
-        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_EXCL
-        get_stdout = os.open(get_stdout, flags = flags, mode = 0o600)
-        close_this = get_stdout
-    stdoutfd = None if isinstance(get_stdout, bool) else get_stdout
-    get_stdout = get_stdout if isinstance(get_stdout, bool) else False
-    if get_stdout:
-        r, w = os.pipe()
-    pid = os.fork()
-    if pid == 0:
+    [(status, output, _)] = spawn_many([cmd], abort_timer = abort_timer, get_stdout = get_stdout)
+    if successful_exits is ...:
+        return output
+    if os.WIFEXITED(status):
+        if os.WEXITSTATUS(status) in successful_exits:
+            return output
+    raise Exception('External command failed')
+
+def spawn_many(cmds, abort_timer = 0, total_timer = 0, get_stdout = True, get_stderr = False, stream = False):
+    '''
+    Spawn processes without stdins, and run them concurrently
+    
+    The output of all processes is read as it becomes available,
+    and the deadlines are enforced by killing the processes that
+    are still running when they expire.
+    
+    @param   cmds:itr<list<str>>                 The commands to run
+    @param   abort_timer:int                     The number of seconds before aborting
+                                                 a process, 0 for never
+    @param   total_timer:int                     The number of seconds before aborting all
+                                                 processes that are still running, 0 for never
+    @param   get_stdout:bool|int|str|list<¿A?>   See `spawn`, either for all processes
+                                                 or as a list with one value per process
+    @param   get_stderr:bool                     Should the processes' stderr be returned
+    @param   stream:bool                         Should the output be returned as it is read
+    @return  :list<(status:int, stdout:bytes?, stderr:bytes?)>
+                                                 For each process, in order: its exit status
+                                                 as returned by `os.waitpid`, its output to
+                                                 stdout if `get_stdout`, and its output to
+                                                 stderr if `get_stderr`
+    @return  :itr<(index:int, what:str, data:bytes|int)>
+                                                 If `stream`: for each read chunk, the index
+                                                 of the process, 'stdout' or 'stderr' and
+                                                 the read bytes, and for each exited process,
+                                                 the index of the process, 'exit', and its
+                                                 exit status as returned by `os.waitpid`
+    '''
+    import selectors, signal
+    cmds = [list(cmd) for cmd in cmds]
+    if not isinstance(get_stdout, list):
+        get_stdout = [get_stdout] * len(cmds)
+    def run():
+        sel = selectors.DefaultSelector()
+        children, pipes, killed, deadlines, starts = {}, {}, set(), {}, {}
+        nread = [0] * len(cmds)
+        total = time.monotonic() + total_timer if total_timer > 0 else None
+        all_pidfds = True
         try:
-            os.close(0)
-        except:
-            pass
-        if get_stdout:
-            os.close(r)
-            stdoutfd = w
-        if stdoutfd is not None and stdoutfd != 1:
-            os.dup2(stdoutfd, 1)
-            os.close(stdoutfd)
-        if int(abort_timer) > 0:
-            import signal
-            signal.alarm(int(abort_timer))
-        os.execvp(cmd[0], cmd)
+            for i, cmd in enumerate(cmds):
+                stdoutfd = get_stdout[i]
+                close_this = None
+                if isinstance(stdoutfd, str):
+                    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_EXCL
+                    stdoutfd = close_this = os.open(stdoutfd, flags = flags, mode = 0o600)
+                new_pipes = []
+                if stdoutfd is True:
+                    new_pipes.append((1, 'stdout') + os.pipe())
+                if get_stderr:
+                    new_pipes.append((2, 'stderr') + os.pipe())
+                started = time.monotonic()
+                pid = os.fork()
+                if pid == 0:
+                    try:
+                        try:
+                            os.close(0)
+                        except:
+                            pass
+                        for fd, _, r, w in new_pipes:
+                            os.close(r)
+                            os.dup2(w, fd)
+                            os.close(w)
+                        if not isinstance(stdoutfd, bool) and stdoutfd != 1:
+                            os.dup2(stdoutfd, 1)
+                            os.close(stdoutfd)
+                        os.execvp(cmd[0], cmd)
+                    finally:
+                        os._exit(127)
+                if close_this is not None:
+                    os.close(close_this)
+                children[pid] = i
+                pipes[i] = []
+                if profile is not None:
+                    starts[pid] = started
+                for _, what, r, w in new_pipes:
+                    os.close(w)
+                    sel.register(r, selectors.EVENT_READ, (i, what))
+                    pipes[i].append(r)
+                if abort_timer > 0:
+                    deadlines[pid] = time.monotonic() + abort_timer
+                try:
+                    sel.register(os.pidfd_open(pid), selectors.EVENT_READ, (i, 'exit'))
+                except (AttributeError, OSError):
+                    all_pidfds = False
+            while len(children) > 0 or len(sel.get_map()) > 0:
+                now = time.monotonic()
+                for pid in children:
+                    if pid not in killed:
+                        if (total is not None and now >= total) or deadlines.get(pid, now + 1) <= now:
+                            os.kill(pid, signal.SIGKILL)
+                            killed.add(pid)
+                timeout = [deadlines[pid] for pid in children if pid in deadlines and pid not in killed]
+                if total is not None and len(killed) < len(children):
+                    timeout.append(total)
+                timeout = max(min(timeout) - now, 0) if len(timeout) > 0 else None
+                if not all_pidfds:
+                    timeout = 0.05 if timeout is None else min(timeout, 0.05)
+                for key, _ in sel.select(timeout):
+                    i, what = key.data
+                    data = b'' if what == 'exit' else os.read(key.fd, 64 << 10)
+                    if len(data) == 0:
+                        sel.unregister(key.fd)
+                        os.close(key.fd)
+                        if key.fd in pipes[i]:
+                            pipes[i].remove(key.fd)
+                    else:
+                        nread[i] += len(data)
+                        yield (i, what, data)
+                for pid in list(children):
+                    reaped, status, usage = os.wait4(pid, os.WNOHANG)
+                    if reaped == 0:
+                        continue
+                    i = children.pop(pid)
+                    if profile is not None:
+                        profile_add('spawn', cmds[i][0], starts[pid], usage.ru_utime + usage.ru_stime,
+                                    command = cmds[i], bytes = nread[i], killed = pid in killed,
+                                    status = os.waitstatus_to_exitcode(status))
+                    if pid in killed:
+                        # Do not wait for grandchildren that inherited the pipes
+                        for fd in pipes[i]:
+                            sel.unregister(fd)
+                            os.close(fd)
+                        pipes[i] = []
+                    yield (i, 'exit', status)
+        finally:
+            for pid in children:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                    os.waitpid(pid, 0)
+                except OSError:
+                    pass
+            for fd in list(sel.get_map()):
+                os.close(fd)
+            sel.close()
+    if stream:
+        return run()
+    rc = [[None, bytearray() if stdoutfd is True else None, bytearray() if get_stderr else None]
+          for stdoutfd in get_stdout]
+    for i, what, data in run():
+        if what == 'exit':
+            rc[i][0] = data
+        else:
+            rc[i][1 if what == 'stdout' else 2] += data
+    return [(status, None if out is None else bytes(out), None if err is None else bytes(err))
+            for status, out, err in rc]
+
+def defer(function, *args, **kwargs):
+    '''
+    Start a function in the background
+    
+    This is intended for plugin functions that spend most
+    of their time waiting for the network or for another
+    process, so that a configuration script can start all
+    of them at the top and collect the results when it
+    needs them. The wall-clock time of the run is then
+    bounded by the slowest of them rather then their sum.
+    
+    @param   function:(...)→¿R?          The function to run
+    @param   args:*?                     Positional arguments for `function`
+    @param   kwargs:**?                  Keyword arguments for `function`
+    @return  :concurrent.futures.Future  The future result of the function,
+                                         call its `result` method to wait for
+                                         and get the return value of `function`
+    '''
+    global executor
+    if executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(max_workers = 16, thread_name_prefix = 'rotd')
+    return executor.submit(function, *args, **kwargs)
+executor = None
+
+def cachedir(*path):
+    '''
+    Get a directory inside rotd's cache directory, the
+    directory is created if it does not already exist
+    
+    The cache directory is $XDG_CACHE_HOME/rotd, or
+    $HOME/.cache/rotd if $XDG_CACHE_HOME is not set.
+    
+    @param   path:*str  The path of the directory relative to the
+                        cache directory, one directory name per argument
+    @return  :str       The absolute path of the directory
+    '''
+    if os.environ.get('XDG_CACHE_HOME', '').startswith('/'):
+        cache = os.environ['XDG_CACHE_HOME']
+    elif os.environ.get('HOME', '') != '':
+        cache = os.environ['HOME'] + '/.cache'
     else:
-        if close_this is not None:
-            os.close(close_this)
-        output = None
-        if get_stdout:
-            os.close(w)
-            output = b''
-            while True:
-                partial = os.read(r, 4096)
-                if len(partial) == 0:
-                    break
-                output += partial
-            os.close(r)
-        _, status = os.waitpid(pid, 0)
-        if successful_exits is ...:
-            return output
-        if os.WIFEXITED(status):
-            if os.WEXITSTATUS(status) in successful_exits:
-                return output
-        raise Exception('External command failed')
+        import pwd
+        cache = pwd.getpwuid(os.getuid()).pw_dir + '/.cache'
+    cache = '/'.join([cache, 'rotd'] + list(path))
+    os.makedirs(cache, exist_ok = True)
+    return cache
+
+def cached_section(key, ttl = 'day', inputs = (), files = (), assets = ()):
+    '''
+    Decorator for functions, in configuration scripts, that
+    return a section of the report, so that the function is
+    only called when its last result has expired or when its
+    inputs have changed
+    
+    The result is stored in $XDG_CACHE_HOME/rotd/sections, once
+    per backend, together with the assets the function wrote to
+    the working directory, which are restored when the stored
+    result is used. The function's arguments are part of its
+    inputs, but its side effects are not repeated.
+    
+        @cached_section('solar', ttl = 'day', files = ['~/.config/geolocation'])
+        def solar_section():
+            ...
+            return text
+        doc += solar_section()
+    
+    @param   key:str            The name the section is stored under
+    @param   ttl:int|str        The number of seconds the result may be used, or
+                                'day', 'week', 'month', or 'year' to use it until
+                                the calendar day, ISO week, month, or year is over
+    @param   inputs:itr<?>      Values the result depends on, they are compared
+                                by their `repr`, which therefore must be stable
+    @param   files:itr<str>     Files the result depends on, the result is not
+                                used if any of them has been modified, created,
+                                or removed
+    @param   assets:itr<str>    Files, in the working directory, that the
+                                function writes and the section includes
+    @return  :(()→str?)→(()→str?)  The decorator
+    '''
+    def decorator(function):
+        import functools
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            import json, hashlib, shutil, urllib.parse, latex
+            name = '%s/%s.%s' % (cachedir('sections'), urllib.parse.quote(key, safe = ''), latex.backend)
+            stamps = []
+            for f in files:
+                try:
+                    st = os.stat(os.path.expanduser(f))
+                    stamps.append((f, st.st_mtime_ns, st.st_size))
+                except OSError:
+                    stamps.append((f, None, None))
+            digest = repr((list(inputs), stamps, args, sorted(kwargs.items())))
+            digest = hashlib.sha256(digest.encode('utf-8')).hexdigest()
+            period = time.strftime(SECTION_PERIODS[ttl]) if isinstance(ttl, str) else None
+            try:
+                with open(name + '.json', 'rb') as file:
+                    entry = json.loads(file.read().decode('utf-8', 'strict'))
+                if entry['inputs'] == digest and (entry['period'] == period if period is not None
+                                                  else 0 <= entry['expires'] - time.time() <= ttl):
+                    for asset in entry['assets']:
+                        shutil.copyfile('%s.d/%s' % (name, asset), asset)
+                    return entry['text']
+            except (OSError, ValueError, KeyError):
+                pass
+            text = function(*args, **kwargs)
+            text = None if text is None else str(text)
+            entry = { 'inputs'  : digest
+                    , 'period'  : period
+                    , 'expires' : None if period is not None else time.time() + ttl
+                    , 'text'    : text
+                    , 'assets'  : [a for a in assets if os.path.isfile(a)]
+                    }
+            temp = '~%i.%i' % (os.getpid(), threading.get_ident())
+            try:
+                if len(entry['assets']) > 0:
+                    os.makedirs(name + '.d', exist_ok = True)
+                for asset in entry['assets']:
+                    shutil.copyfile(asset, '%s.d/%s%s' % (name, asset, temp))
+                    os.rename('%s.d/%s%s' % (name, asset, temp), '%s.d/%s' % (name, asset))
+                with open(name + '.json' + temp, 'wb') as file:
+                    file.write(json.dumps(entry).encode('utf-8'))
+                    file.flush()
+                os.rename(name + '.json' + temp, name + '.json')
+            except OSError:
+                pass
+            return text
+        return wrapper
+    return decorator
+# strftime formats of the periods `cached_section` accepts as TTL
+SECTION_PERIODS = { 'day'   : '%Y-%m-%d'
+                  , 'week'  : '%G-W%V'
+                  , 'month' : '%Y-%m'
+                  , 'year'  : '%Y'
+                  }
 
 def write(text):
     '''
-    Add some code to the LaTex file.
+    Add some code to the LaTeX file, or to
+    the report itself if it is not a PDF.
     
     It is recommended to run this seldom
     for better performance.
     
-    @param  text:str  The text to write.
+    @param  text:str|itr<str>  The text to write, or a sequence of texts,
+                               such as a `latex.Document`, to write in one go.
     '''
-    texfile.write(text.encode('utf-8'))
+    for fragment in ([text] if isinstance(text, str) else text):
+        texfile.write(fragment.encode('utf-8'))
     texfile.flush()
 
+def pdflatex(filename, passes = None):
+    '''
+    Compile a LaTeX file into a PDF file
+    
+    Unless the number of passes is specified, pdflatex is
+    rerun only if the log says that it should be rerun or
+    if the auxiliary files it writes changed, in ways that
+    can affect the output, during the last pass. A .aux file
+    that did not exist before the pass does not count as a
+    change, since pdflatex always writes one; if the document
+    refers to it, the log reports undefined references.
+    
+    If a PDF file has been compiled from the same LaTeX file,
+    with the same assets, before, it is taken from the cache
+    in $XDG_CACHE_HOME/rotd/pdf and pdflatex is not run at all,
+    see `pdf_cache_key`.
+    
+    @param  filename:str  The LaTeX file
+    @param  passes:int?   The number of times to run pdflatex,
+                          `None` to run it as many times as needed
+    '''
+    import shutil
+    base = filename[:-4] if filename.endswith('.tex') else filename
+    key = pdf_cache_key(filename, passes) if pdf_cache_size > 0 else None
+    if key is not None:
+        cached = '%s/%s.pdf' % (cachedir('pdf'), key)
+        try:
+            start = time.monotonic()
+            os.utime(cached)
+            shutil.copyfile(cached, base + '.pdf')
+            if profile is not None:
+                profile_add('latex', filename, start, 0, cached = True)
+            return
+        except FileNotFoundError:
+            pass
+    def auxiliary():
+        rc = {}
+        for ext in LATEX_AUXILIARY:
+            try:
+                with open(base + ext, 'rb') as file:
+                    rc[ext] = file.read().split(b'\n')
+            except FileNotFoundError:
+                rc[ext] = None if ext == '.aux' else []
+                continue
+            rc[ext] = [line for line in rc[ext] if not line.strip() == b'' and
+                       not any(line.startswith(x) for x in LATEX_IGNORED_AUXILIARY)]
+        return rc
+    for i in range(LATEX_MAX_PASSES if passes is None else passes):
+        before = auxiliary() if passes is None else None
+        if profile is not None:
+            import resource
+            start, cpu = time.monotonic(), resource.getrusage(resource.RUSAGE_CHILDREN)
+        spawn('pdflatex', '-halt-on-error', '--', filename)
+        if profile is not None:
+            usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpu = usage.ru_utime + usage.ru_stime - cpu.ru_utime - cpu.ru_stime
+            profile_add('latex', filename, start, cpu, **{'pass' : i + 1})
+        if passes is None:
+            with open(base + '.log', 'rb') as file:
+                log = file.read()
+            after = auxiliary()
+            if any(x in log for x in LATEX_RERUN_MESSAGES):
+                continue
+            if before['.aux'] is None and any(x in log for x in LATEX_UNDEFINED_MESSAGES):
+                continue
+            if not any(old is not None and old != after[ext] for ext, old in before.items()):
+                break
+    if key is not None:
+        pdf_cache_store(key, base + '.pdf')
+
+def pdf_cache_key(filename, passes = None):
+    '''
+    Get the key a PDF file is cached under
+    
+    The key is a hash of the LaTeX file, all other files in
+    its directory, except those whose names begin with the
+    name of the LaTeX file without its extension (pdflatex's
+    and `latex.validate`'s own files), of the pdflatex
+    that is used, and of the date of the report (\\today),
+    so that a PDF is reused only if it was compiled from
+    exactly the same source and assets on the same date
+    
+    @param   filename:str  The LaTeX file
+    @param   passes:int?   The number of times pdflatex is run, see `pdflatex`
+    @return  :str          The key, in hexadecimal
+    '''
+    import hashlib, shutil
+    directory = os.path.dirname(os.path.abspath(filename))
+    base = os.path.basename(filename)
+    base = base[:-4] if base.endswith('.tex') else base
+    program = shutil.which('pdflatex')
+    digest = hashlib.sha256(repr((passes, time.strftime('%Y-%m-%d'), program, None if program is None else os.stat(program).st_mtime_ns)).encode('utf-8'))
+    files = [os.path.abspath(filename)]
+    for path, dirs, names in os.walk(directory):
+        dirs.sort()
+        files += ['%s/%s' % (path, f) for f in sorted(names) if path != directory or not f.startswith(base)]
+    for f in files:
+        with open(f, 'rb') as file:
+            data = file.read()
+        digest.update(('\0%s\0%i\0' % (os.path.relpath(f, directory), len(data))).encode('utf-8'))
+        digest.update(data)
+    return digest.hexdigest()
+
+def pdf_cache_store(key, pdffile):
+    '''
+    Add a PDF file to the cache, and remove the least recently
+    used files from the cache if it has grown too large
+    
+    @param  key:str      The key, see `pdf_cache_key`
+    @param  pdffile:str  The PDF file
+    '''
+    import shutil
+    cache = cachedir('pdf')
+    temp = '%s/%s.pdf~%i.%i' % (cache, key, os.getpid(), threading.get_ident())
+    try:
+        shutil.copyfile(pdffile, temp)
+        os.rename(temp, '%s/%s.pdf' % (cache, key))
+    except OSError:
+        return
+    entries = []
+    for f in os.listdir(cache):
+        try:
+            if f.endswith('.pdf'):
+                st = os.stat('%s/%s' % (cache, f))
+                entries.append((st.st_mtime, st.st_size, f))
+        except FileNotFoundError:
+            pass
+    total = 0
+    for mtime, size, f in sorted(entries, reverse = True):
+        total += size
+        if total > pdf_cache_size:
+            try:
+                os.unlink('%s/%s' % (cache, f))
+            except FileNotFoundError:
+                pass
+
+# Extensions of files pdflatex writes and reads back in the next pass
+LATEX_AUXILIARY = ('.aux', '.toc', '.lof', '.lot', '.out', '.nav', '.snm')
+# Lines pdflatex writes to the .aux file that do not affect the next pass,
+# the total page counts (\gdef\@abspage@last, \memsetcounter{lastpage}, ...)
+# are not among them, they are used for "page X of Y"
+LATEX_IGNORED_AUXILIARY = (b'\\relax',)
+# Messages in the log that means that pdflatex should be rerun
+LATEX_RERUN_MESSAGES = (b'Rerun to get', b'Rerun LaTeX', b'Label(s) may have changed', b'Please rerun LaTeX')
+# Messages in the log that means that pdflatex should be rerun if there was no .aux file
+LATEX_UNDEFINED_MESSAGES = (b'There were undefined references', b'There were undefined citations')
+# The number of times pdflatex is run, at most, if the number of passes is not specified
+LATEX_MAX_PASSES = 5
+
+# The number of times pdflatex shall be run, `None` to run
+# it as many times as needed, configuration scripts can
+# set this to 1 or 2 if they do not want it automatic
+latex_passes = None
+
+# The maximum total size, in bytes, of the PDF files kept in
+# the cache, configuration scripts can set this to 0 to
+# always run pdflatex, see `pdflatex`
+pdf_cache_size = 64 << 20
+
 # Get current globals
 g = globals()
 
@@ -115,37 +525,166 @@ def setproctitle(title):
         pass
 setproctitle(argv0)
 
+# The entries of the profile of the report that is being
+# generated, `None` unless the report is being profiled
+profile = None
+
+def profile_add(kind, name, start, cpu, **info):
+    '''
+    Add an entry to the profile
+    
+    @param  kind:str    The kind of entry: 'config', 'spawn', 'plugin', or 'latex'
+    @param  name:str    What was timed
+    @param  start:int   The value of `time.monotonic()` when it started
+    @param  cpu:float   The number of seconds of CPU time it used
+    @param  info:**?    Additional information for the entry
+    '''
+    now = time.monotonic()
+    info.update({ 'kind'  : kind
+                , 'name'  : name
+                , 'start' : start - profile_start
+                , 'wall'  : now - start
+                , 'cpu'   : cpu
+                })
+    profile.append(info)
+
+def profile_plugins():
+    '''
+    Make all calls to public functions and methods in the
+    installed plugins add an entry to the profile
+    
+    Calls made by the plugins themselves are not recorded,
+    their time is included in the call that made them.
+    '''
+    import importlib, inspect, functools
+    nested = threading.local()
+    def wrap(name, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if getattr(nested, 'value', False):
+                return function(*args, **kwargs)
+            start, cpu = time.monotonic(), time.thread_time()
+            nested.value = True
+            try:
+                return function(*args, **kwargs)
+            finally:
+                nested.value = False
+                profile_add('plugin', name, start, time.thread_time() - cpu)
+        return wrapper
+    for plugin in PLUGINS:
+        try:
+            module = importlib.import_module(plugin)
+        except ImportError:
+            continue
+        for name, value in list(vars(module).items()):
+            if name.startswith('_') or getattr(value, '__module__', None) != plugin:
+                continue
+            if inspect.isfunction(value):
+                setattr(module, name, wrap('%s.%s' % (plugin, name), value))
+            elif inspect.isclass(value):
+                for method, function in list(vars(value).items()):
+                    if not method.startswith('_') and inspect.isfunction(function):
+                        setattr(value, method, wrap('%s.%s.%s' % (plugin, name, method), function))
+
+def profile_file(output_file):
+    '''
+    Get the pathname of the file to write the profile of a report to
+    
+    @param   output_file:str  The file to which the report is written, `-` for stdout
+    @return  :str             The output file with the suffix .profile.json, or
+                              rotd.profile.json in the working directory if the
+                              report is written to stdout or to a device
+    '''
+    if output_file == '-' or output_file.lstrip('/').startswith(('dev/', 'proc/')):
+        return os.path.abspath('rotd.profile.json')
+    return os.path.abspath(output_file + '.profile.json')
+
+def output_backend(output_file, output_format = None):
+    '''
+    Select the markup the report is written in
+    
+    @param   output_file:str     The file to which the report is written, `-` for stdout
+    @param   output_format:str?  The format selected with -f, `None` to select
+                                 it from the output file's extension
+    @return  :str                The `latex.backend` to use: 'latex', for a PDF
+                                 made by pdflatex, 'html', 'markdown', or 'text'
+    '''
+    if output_format is not None:
+        return OUTPUT_FORMATS[output_format]
+    return OUTPUT_FORMATS.get(os.path.splitext(output_file)[1][1:].lower(), 'latex')
+# The backend for each output format, given with -f or as the output file's extension
+OUTPUT_FORMATS = { 'pdf'      : 'latex'
+                 , 'html'     : 'html'
+                 , 'htm'      : 'html'
+                 , 'md'       : 'markdown'
+                 , 'markdown' : 'markdown'
+                 , 'txt'      : 'text'
+                 , 'text'     : 'text'
+                 }
+
 # Parse command line
 def usage():
-    print('Usage: %s [-c config-file] output-file' % argv0, file = sys.stderr)
+    print('Usage: %s [-p] [-c config-file] [-t date] [-f format] [-s socket] output-file' % argv0, file = sys.stderr)
+    print('       %s [-p] [-t date] [-f format] -b manifest-file' % argv0, file = sys.stderr)
+    print('       %s -D [-s socket]' % argv0, file = sys.stderr)
     sys.exit(1)
-config_file = None
+options = {}
 i, n = 1, len(sys.argv)
 while i < n:
     arg = sys.argv[i]
     if arg.startswith('--'):
         i += 1
         break
-    elif arg.startswith('-'):
-        if arg.startswith('-c'):
-            if arg == '-c':
-                if i == n:
+    elif arg in ('-D', '-p'):
+        options[arg[1]] = True
+    elif arg.startswith('-') and arg != '-':
+        if arg[1] in 'cbstf':
+            if len(arg) == 2:
+                if i + 1 == n:
                     usage()
                 i += 1
-                config_file = sys.argv[i]
+                options[arg[1]] = sys.argv[i]
             else:
-                config_file = arg[2:]
+                options[arg[1]] = arg[2:]
         else:
             usage()
     else:
         break
     i += 1
-if i + 1 != n:
+config_file   = options.get('c', None)
+manifest_file = options.get('b', None)
+socket_file   = options.get('s', None)
+date          = options.get('t', None)
+output_format = options.get('f', None)
+profiled      = 'p' in options
+output_file   = None
+if 'D' in options:
+    if i != n or config_file is not None or manifest_file is not None or date is not None or profiled:
+        usage()
+    if output_format is not None:
+        usage()
+elif manifest_file is not None:
+    if i != n or config_file is not None or socket_file is not None:
+        usage()
+else:
+    if i + 1 != n:
+        usage()
+    output_file = sys.argv[i]
+if date is not None:
+    try:
+        time.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        usage()
+if output_format is not None and output_format not in OUTPUT_FORMATS:
     usage()
-output_file = sys.argv[i]
 
-# Find configuration script
-if config_file is None:
+def find_config_file():
+    '''
+    Find the default configuration script
+    
+    @return  :str?  The pathname of the configuration script,
+                    `None` if there is none
+    '''
     # Possible auto-selected configuration scripts,
     # earlier ones have precedence, we can only select one.
     for file in ('$XDG_CONFIG_HOME/%/%rc', '$HOME/.config/%/%rc', '$HOME/.%rc', '$~/.config/%/%rc', '$~/.%rc', '/etc/%rc'):
@@ -177,77 +716,491 @@ if config_file is None:
             file = file.replace('\0', '$')
             # If the file we exists,
             if os.path.exists(file):
-                # select it,
-                config_file = file
-                # and stop trying files with lower precedence.
-                break
+                # select it, and stop trying files with lower precedence.
+                return file
+    return None
+
+def load_config(config_file):
+    '''
+    Read and compile a configuration script, unless it has
+    been compiled before and has not been modified since
+    
+    @param   config_file:str  The pathname of the configuration script
+    @return  :code            The compiled configuration script
+    '''
+    mtime = os.stat(config_file).st_mtime_ns
+    if config_file not in configs or configs[config_file][0] != mtime:
+        # Read configuration script file
+        with open(config_file, 'rb') as script:
+            code = script.read()
+        # Decode configurion script file and add a line break
+        # at the end to ensure that the last line is empty.
+        # If it is not, we will get errors.
+        code = code.decode('utf-8', 'strict') + '\n'
+        # Compile the configuration script,
+        configs[config_file] = (mtime, compile(code, config_file, 'exec'))
+    return configs[config_file][1]
+# Compiled configuration scripts, pathname → (modification time, code)
+configs = {}
+
+def set_date(date):
+    '''
+    Make the time functions in the module `time` pretend that it is another day
+    
+    The clock is moved by a whole number of days, so the
+    time of the day is kept.
+    
+    @param  date:str  The date, in %Y-%m-%d format
+    '''
+    real_time, real_localtime, real_gmtime, real_strftime = clock
+    today = time.mktime(real_localtime()[:3] + (12, 0, 0, 0, 0, -1))
+    then = time.mktime(time.strptime(date + ' 12', '%Y-%m-%d %H'))
+    offset = round((then - today) / (24 * 60 * 60)) * (24 * 60 * 60)
+    time.time = lambda : real_time() + offset
+    time.localtime = lambda t = None : real_localtime(time.time() if t is None else t)
+    time.gmtime = lambda t = None : real_gmtime(time.time() if t is None else t)
+    time.strftime = lambda f, t = None : real_strftime(f, time.localtime() if t is None else t)
+# The real time functions, used by `set_date`
+clock = (time.time, time.localtime, time.gmtime, time.strftime)
+
+def terminate(status):
+    '''
+    Exit a forked process, without returning to the code that forked it
+    
+    @param  status:int  The exit value
+    '''
+    if executor is not None:
+        executor.shutdown()
+    import atexit
+    atexit._run_exitfuncs()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(status)
+
+def render(config_file, output_file, date = None, profiled = False, output_format = None):
+    '''
+    Run a configuration script and compile the report it writes
+    
+    The report is generated in a child process, so that the
+    configuration script cannot affect the calling process.
+    
+    Unless the report is a PDF, the plugins write it directly
+    in HTML, Markdown, or plain text, and pdflatex is not run.
+    
+    @param   config_file:str    The pathname of the configuration script
+    @param   output_file:str    The file to which to write the report, `-` for stdout
+    @param   date:str?          The date, in %Y-%m-%d format, to generate the report
+                                for, `None` for today
+    @param   profiled:bool|str  Whether to write a profile of the run, see `profile_file`,
+                                or the pathname of the file to write it to
+    @param   output_format:str? The format of the report, see `output_backend`
+    @return  :int               The exit value of the process that generated the report
+    '''
+    global texfile, profile, profile_start
+    
+    # Compile the configuration script, this is done before
+    # we fork so that it is not recompiled when the daemon
+    # is asked to generate another report using it
+    code = load_config(config_file)
+    
+    # Create temporary directory
+    cwd = os.getcwd()
+    tempdir = '/tmp/rotd.%f~%i~%i.d' % (time.time(), os.getuid(), os.getpid())
+    os.mkdir(tempdir)
+    
+    # Fork to ensure cleanup
+    pid = os.fork()
+    if pid != 0:
+        # Block signals
+        import signal
+        mask = [x for x in range(1, signal.NSIG) if x != signal.SIGCHLD]
+        signal.pthread_sigmask(signal.SIG_BLOCK, mask)
+        # Wait of child to die
+        pid, status = os.waitpid(pid, 0)
+        # Remove temporary files
+        spawn('rm', '-rf', '--', tempdir, successful_exits = ...)
+        # Unblock signals
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, mask)
+        # Die like the child (if we are still alive)
+        return os.WEXITSTATUS(status) if os.WIFEXITED(status) else 1
+    
+    status = 1
+    if profiled:
+        profile, profile_start = [], time.monotonic()
+        cpu = time.process_time()
+    try:
+        if profiled:
+            profile_plugins()
+        if date is not None:
+            set_date(date)
+        
+        # Select the markup the plugins write
+        import latex
+        latex.backend = output_backend(output_file, output_format)
+        srcfile = 'rotd.tex' if latex.backend == 'latex' else 'rotd.' + BACKEND_EXTENSIONS[latex.backend]
+        
+        # Open LaTeX file, or the report itself, used in function `write`
+        os.chdir(tempdir)
+        texfile = open(srcfile, 'ab')
+        
+        # Run script
+        if profiled:
+            start, thread_cpu = time.monotonic(), time.thread_time()
+        exec(code, g)
+        if profiled:
+            profile_add('config', config_file, start, time.thread_time() - thread_cpu)
+        
+        # Compile PDF file
+        texfile.close()
+        if latex.backend == 'latex':
+            pdflatex('rotd.tex', passes = latex_passes)
+            srcfile = 'rotd.pdf'
+        
+        # Move or print file?
+        print_output = False
+        if output_file[:1] == '/':
+            if output_file.lstrip('/').startswith(('dev/', 'proc/')):
+                print_output = True
+        elif output_file == '-':
+            print_output = True
+            output_file = '/dev/stdout'
+        
+        # Move or print file!
+        os.chdir(cwd)
+        reportfile = '%s/%s' % (tempdir, srcfile)
+        if print_output:
+            with open(reportfile, 'rb') as file:
+                data = file.read()
+            with open(output_file, 'wb') as file:
+                file.write(data)
+                file.flush()
+        else:
+            spawn('mv', '--', reportfile, output_file)
+        status = 0
+    except SystemExit as err:
+        if err.code is None or isinstance(err.code, int):
+            status = 0 if err.code is None else err.code
+        else:
+            print(err.code, file = sys.stderr)
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+    if profiled:
+        import json
+        report = { 'config'  : config_file
+                 , 'output'  : output_file
+                 , 'date'    : time.strftime('%Y-%m-%d')
+                 , 'status'  : status
+                 , 'wall'    : time.monotonic() - profile_start
+                 , 'cpu'     : time.process_time() - cpu
+                 , 'entries' : sorted(profile, key = lambda entry : entry['start'])
+                 }
+        try:
+            with open(profiled if isinstance(profiled, str) else profile_file(output_file), 'wb') as file:
+                file.write(json.dumps(report, indent = 1).encode('utf-8'))
+                file.flush()
+        except OSError as err:
+            print('%s: %s' % (argv0, str(err)), file = sys.stderr)
+    terminate(status)
+# The extension of the report file, for each backend other than LaTeX
+BACKEND_EXTENSIONS = { 'html' : 'html', 'markdown' : 'md', 'text' : 'txt' }
+
+def batch(manifest_file, date = None, profiled = False, output_format = None):
+    '''
+    Generate a number of reports in parallel
+    
+    Each non-empty line in the manifest, that does not start
+    with `#`, shall contain the pathname of a configuration
+    script followed by the file to which the report shall be
+    written, separated by whitespace. Relative pathnames are
+    relative to the directory of the manifest.
+    
+    Data that is common to all reports, such as the leap-second
+    list and the xkcd comic to show, is fetched once, before the
+    reports are generated. At most one report per CPU is
+    generated at a time.
+    
+    @param   manifest_file:str  The pathname of the manifest
+    @param   date:str?          The date, in %Y-%m-%d format, to generate the
+                                reports for, `None` for today
+    @param   profiled:bool      Whether to write a profile of each report
+    @param   output_format:str? The format of all reports, `None` to select it
+                                from each output file, see `output_backend`
+    @return  :int               0 if all reports were generated, 1 otherwise
+    '''
+    global executor
+    if date is not None:
+        set_date(date)
+    with open(manifest_file, 'rb') as file:
+        manifest = file.read().decode('utf-8', 'strict').split('\n')
+    directory = os.path.dirname(os.path.realpath(manifest_file))
+    jobs = []
+    for line in manifest:
+        line = line.strip()
+        if line == '' or line.startswith('#'):
+            continue
+        job = line.split()
+        if len(job) != 2:
+            print('%s: invalid line in manifest: %s' % (argv0, line), file = sys.stderr)
+            return 1
+        job = [x if x.startswith('/') or x == '-' else os.path.join(directory, x) for x in job]
+        jobs.append((os.path.realpath(job[0]), job[1]))
+    
+    # Import the plugins and fetch the shared data, using
+    # many threads, before we fork so that the reports
+    # inherit them instead of fetching them themselves
+    futures = [defer(share, *x) for x in BATCH_SHARED]
+    for future in futures:
+        future.result()
+    executor.shutdown()
+    executor = None
+    
+    # Generate the reports
+    running, failed = {}, []
+    for job in jobs:
+        if len(running) >= (os.cpu_count() or 1):
+            pid, status = os.waitpid(-1, 0)
+            if status != 0:
+                failed.append(running[pid])
+            del running[pid]
+        pid = os.fork()
+        if pid == 0:
+            setproctitle('%s %s' % (argv0, job[1]))
+            terminate(render(*job, date = date, profiled = profiled, output_format = output_format))
+        running[pid] = job
+    while len(running) > 0:
+        pid, status = os.waitpid(-1, 0)
+        if status != 0:
+            failed.append(running[pid])
+        del running[pid]
+    for config_file, output_file in failed:
+        print('%s: failed to generate %s using %s' % (argv0, output_file, config_file), file = sys.stderr)
+    return 0 if len(failed) == 0 else 1
+
+def share(plugin, function, *args, **kwargs):
+    '''
+    Make a plugin function remember its return values, and call it
+    
+    This is used in batch mode, before the reports are generated,
+    so that the reports get the result without calling the function
+    themselves. Each caller gets its own copy of the return value.
+    
+    @param  plugin:str    The name of the plugin
+    @param  function:str  The name of the function in the plugin
+    @param  args:*?       Positional arguments to call the function with
+    @param  kwargs:**?    Keyword arguments to call the function with
+    '''
+    import importlib, inspect, copy
+    try:
+        module = importlib.import_module(plugin)
+    except ImportError:
+        return
+    with share_lock:
+        f = getattr(module, function)
+        if not hasattr(f, 'memo'):
+            real, signature = f, inspect.signature(f)
+            def f(*args, **kwargs):
+                args = signature.bind(*args, **kwargs)
+                args.apply_defaults()
+                key = repr(args.arguments)
+                if key not in f.memo:
+                    f.memo[key] = real(*args.args, **args.kwargs)
+                return copy.deepcopy(f.memo[key])
+            f.memo = {}
+            f.__doc__ = real.__doc__
+            setattr(module, function, f)
+    try:
+        f(*args, **kwargs)
+    except:
+        pass
+share_lock = threading.Lock()
+
+# Plugin functions called, and whose return values are passed
+# on to the reports, before the reports are generated in batch
+# mode: (plugin, function, *positional arguments)
+BATCH_SHARED = (('leapsec', 'leap_seconds'),
+                ('xkcd', 'next_comic'),
+                ('wotd', 'wotd_latex', 'en'),
+                ('wotd', 'wotd_latex', 'sv'),
+                ('events', 'swedish_holidays'),
+                ('events', 'swedish_events'))
+
+def default_socket():
+    '''
+    Get the pathname of the socket the daemon listens on by default
+    
+    @return  :str  $XDG_RUNTIME_DIR/rotd.socket, or /tmp/rotd.$UID.socket
+                   if $XDG_RUNTIME_DIR is not set
+    '''
+    if os.environ.get('XDG_RUNTIME_DIR', '').startswith('/'):
+        return os.environ['XDG_RUNTIME_DIR'] + '/rotd.socket'
+    return '/tmp/rotd.%i.socket' % os.getuid()
+
+def daemon(socket_file):
+    '''
+    Run as a daemon that generates reports on request from `client`
+    
+    The plugins are imported once, and configuration scripts are
+    only recompiled when they are modified, each report is generated
+    in a child process that inherits them. Caches that the plugins
+    keep in memory are only inherited if they are filled in by the
+    daemon itself, before it forks, see `warm_caches`.
+    
+    @param   socket_file:str  The pathname of the UNIX socket to listen on
+    @return  :int             The exit value of the process
+    '''
+    import socket, json, signal, importlib
+    for plugin in PLUGINS + ('solar_python',):
+        try:
+            importlib.import_module(plugin)
+        except ImportError:
+            pass
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    if os.path.exists(socket_file):
+        try:
+            server.connect(socket_file)
+            print('%s: %s is already in use' % (argv0, socket_file), file = sys.stderr)
+            return 1
+        except ConnectionRefusedError:
+            os.unlink(socket_file)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o077)
+    server.bind(socket_file)
+    os.umask(umask)
+    server.listen(16)
+    server.settimeout(60)
+    signal.signal(signal.SIGTERM, lambda *_ : sys.exit(0))
+    try:
+        while True:
+            # Reap finished requests
+            try:
+                while os.waitpid(-1, os.WNOHANG)[0] != 0:
+                    pass
+            except ChildProcessError:
+                pass
+            try:
+                connection, _ = server.accept()
+            except socket.timeout:
+                continue
+            with connection:
+                connection.settimeout(10)
+                try:
+                    request = json.loads(connection.makefile('rb').readline().decode('utf-8', 'strict'))
+                    load_config(request['config'])
+                except Exception as err:
+                    print('%s: bad request: %s' % (argv0, str(err)), file = sys.stderr)
+                    try:
+                        reply = { 'status' : 1, 'error' : 'bad request: %s' % str(err) }
+                        connection.sendall(('%s\n' % json.dumps(reply)).encode('utf-8'))
+                    except OSError:
+                        pass
+                    continue
+                warm_caches()
+                if os.fork() == 0:
+                    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                    server.close()
+                    connection.settimeout(None)
+                    setproctitle('%s %s' % (argv0, request['output']))
+                    status = 1
+                    try:
+                        output_file = request['output']
+                        if output_file == '-':
+                            output_file = '/tmp/rotd.%f~%i~%i.pdf' % (time.time(), os.getuid(), os.getpid())
+                        status = render(request['config'], output_file, request.get('date', None),
+                                        profiled = request.get('profile', None) or False,
+                                        output_format = request.get('format', None))
+                        connection.sendall(('%s\n' % json.dumps({'status' : status})).encode('utf-8'))
+                        if request['output'] == '-' and status == 0:
+                            with open(output_file, 'rb') as file:
+                                connection.sendall(file.read())
+                            os.unlink(output_file)
+                    except Exception:
+                        import traceback
+                        traceback.print_exc()
+                    terminate(status)
+    finally:
+        server.close()
+        os.unlink(socket_file)
+
+def warm_caches():
+    '''
+    Fill in the caches, that plugins keep in memory, that do not depend
+    on the report, in the daemon, so that the processes it forks for
+    each report inherit them instead of filling them in again
+    
+    Caches that are already filled in are reused, so this is cheap
+    after the first request, except when, for example, a new year
+    has begun or a fortune file has been modified.
+    '''
+    import importlib
+    for plugin, function, *args in DAEMON_WARMED:
+        try:
+            getattr(importlib.import_module(plugin), function)(*args)
+        except:
+            pass
+
+# Plugin functions the daemon calls, before it forks, to fill in the
+# caches the plugins keep in memory: (plugin, function, *positional arguments),
+# the return values are not used
+DAEMON_WARMED = (('events', 'swedish_holidays'),          # compiled calendars
+                 ('events', 'swedish_events'),
+                 ('summertime', 'summer_time_events'),    # parsed time zone
+                 ('fortune', 'fortune', 5, 80, 0),         # fortune indices
+                 ('solar', 'Solar', 0, 0, 'string', True)) # times on disk
+
+def client(socket_file, config_file, output_file, date = None, profiled = False, output_format = None):
+    '''
+    Ask the daemon to generate a report
+    
+    @param   socket_file:str  The pathname of the UNIX socket the daemon listens on
+    @param   config_file:str  The pathname of the configuration script
+    @param   output_file:str  The file to which to write the report, `-` for stdout
+    @param   date:str?        The date, in %Y-%m-%d format, to generate the report
+                              for, `None` for today
+    @param   profiled:bool    Whether to write a profile of the run, see `profile_file`
+    @param   output_format:str?  The format of the report, see `output_backend`
+    @return  :int             0 if the report was generated, 1 otherwise
+    '''
+    import socket, json
+    if output_file != '-':
+        output_file = os.path.abspath(output_file)
+    request = { 'config'  : config_file
+              , 'output'  : output_file
+              , 'date'    : date
+              , 'profile' : profile_file(output_file) if profiled else None
+              , 'format'  : output_format
+              }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_file)
+        connection.sendall(('%s\n' % json.dumps(request)).encode('utf-8'))
+        response = connection.makefile('rb')
+        try:
+            reply = json.loads(response.readline().decode('utf-8', 'strict'))
+            status = reply['status']
+        except (ValueError, KeyError, TypeError):
+            print('%s: no valid reply from the daemon' % argv0, file = sys.stderr)
+            return 1
+        if 'error' in reply:
+            print('%s: %s' % (argv0, reply['error']), file = sys.stderr)
+        if output_file == '-' and status == 0:
+            sys.stdout.buffer.write(response.read())
+            sys.stdout.buffer.flush()
+    return 0 if status == 0 else 1
+
+if 'D' in options:
+    sys.exit(daemon(socket_file if socket_file is not None else default_socket()))
+
+if manifest_file is not None:
+    sys.exit(batch(manifest_file, date, profiled, output_format))
+
+# Find configuration script
+if config_file is None:
+    config_file = find_config_file()
 if config_file is None:
     print('No configuration file found', file = sys.stderr)
     sys.exit(1)
 config_file = os.path.realpath(config_file)
 
-# Create temporary directory
-cwd = os.getcwd()
-tempdir = '/tmp/rotd.%f~%i.d' % (time.time(), os.getuid())
-os.mkdir(tempdir)
-
-# Fork to ensure cleanup
-pid = os.fork()
-if pid != 0:
-    # Block signals
-    import signal
-    mask = [x for x in range(1, signal.NSIG) if x != signal.SIGCHLD]
-    signal.pthread_sigmask(signal.SIG_BLOCK, mask)
-    # Wait of child to die
-    pid, status = os.waitpid(pid, 0)
-    # Remove temporary files
-    spawn('rm', '-rf', '--', tempdir, successful_exits = ...)
-    # Unblock signals
-    signal.pthread_sigmask(signal.SIG_UNBLOCK, mask)
-    # Die like the child (if we are still alive)
-    sys.exit(os.WEXITSTATUS(status))
-
-# Open LaTeX file, used in function `write`
-os.chdir(tempdir)
-texfile = open('rotd.tex', 'ab')
-
-# Read configuration script file
-with open(config_file, 'rb') as script:
-    code = script.read()
-# Decode configurion script file and add a line break
-# at the end to ensure that the last line is empty.
-# If it is not, we will get errors.
-code = code.decode('utf-8', 'strict') + '\n'
-# Compile the configuration script,
-code = compile(code, config_file, 'exec')
-# Run script
-exec(code, g)
-
-# Compile PDF file
-texfile.close()
-spawn('pdflatex', '-halt-on-error', '--', 'rotd.tex')
-spawn('pdflatex', '-halt-on-error', '--', 'rotd.tex')
-
-# Move or print file?
-print_output = False
-if output_file[:1] == '/':
-    while output_file[:1] == '/':
-        output_file = output_file[1:]
-    if output_file in ('dev/', 'proc/'):
-        print_output = True
-    output_file = sys.argv[1]
-elif output_file == '-':
-    print_output = True
-    output_file = '/dev/stdout'
-
-# Move or print file!
-os.chdir(cwd)
-pdffile = '%s/rotd.pdf' % tempdir
-if print_output:
-    with open(pdffile, 'rb') as file:
-        data = file.read()
-    with open(output_file, 'wb') as file:
-        file.write(data)
-        file.flush()
-else:
-    spawn('mv', '--', pdffile, output_file)
+if socket_file is not None:
+    sys.exit(client(socket_file, config_file, output_file, date, profiled, output_format))
+sys.exit(render(config_file, output_file, date, profiled, output_format))
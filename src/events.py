@@ -5,6 +5,9 @@ def filter_events(events, inclusion_period = 10):
     '''
     Filter a list of events to only include events that will happen soon
     
+    If you are going to filter the same events more than once,
+    create an `EventIndex` and use its `filter` method instead.
+    
     @param   events:itr<(data:¿D?, date:str)>        List of events, each element shall be 2-tuple,
                                                      where the first element will be passed unmodified
                                                      in the return, the second element shall be the
@@ -15,30 +18,95 @@ def filter_events(events, inclusion_period = 10):
                                                             0 if today
                                                        date: a date structure of the date it event occurs
     '''
-    try:
-        import time
+    return EventIndex(events).filter(inclusion_period)
+
+
+class EventIndex:
+    '''
+    An index of events that can be filtered, like with `filter_events`,
+    to only include events that will happen soon
+    
+    The dates are parsed once, when the index is created, and are
+    stored as day numbers in sorted lists, so that a query only
+    looks at the events that are near the queried period.
+    Events that occur every year are stored only once.
+    '''
+    
+    def __init__(self, events):
+        '''
+        Constructor
+        
+        @param  events:itr<(data:¿D?, date:str)>  See `filter_events`
+        '''
+        import datetime
+        fixed, recurring = [], []
+        for seq, (data, date) in enumerate(events):
+            parts = [int(x) for x in date.split('-')]
+            if len(parts) == 2:
+                (mon, mday) = parts
+                datetime.date(2000, mon, mday) # Validate the date
+                recurring.append((mon * 32 + mday, seq, data, date))
+            else:
+                (year, mon, mday) = parts
+                fixed.append((datetime.date(year, mon, mday).toordinal(), seq, data, date))
+        fixed.sort(key = lambda x : x[:2])
+        recurring.sort(key = lambda x : x[:2])
+        self.fixed = fixed
+        self.fixed_keys = [x[0] for x in fixed]
+        self.recurring = recurring
+        self.recurring_keys = [x[0] for x in recurring]
+    
+    
+    def filter(self, inclusion_period = 10):
+        '''
+        Get the events that will happen soon
+        
+        Events that occur every year on February 29
+        are skipped in years that are not leap years
+        
+        @param   inclusion_period:int                    The number of days, including today,
+                                                         to include events for
+        @return  :list<(data:¿D?, days:int, date:date)>  See `filter_events`
+        '''
+        import time, datetime, bisect
         now = time.localtime()
         year = now.tm_year
         tz = time.strftime('%z', now)
         tz = (int(tz[:3]) * 60 + int(tz[:1] + tz[3:])) * 60
         now = int(time.strftime('%s', now))
         a_day = 60 * 60 * 24
+        # The result is calculated with the same arithmetics as `filter_events`
+        # always did, but only for the events that are within a day of the
+        # period, which are the only ones that can be in the period
+        today = now // a_day + datetime.date(1970, 1, 1).toordinal()
+        first, last = today - 2, today + inclusion_period + 1
+        candidates = []
+        i = bisect.bisect_left(self.fixed_keys, first)
+        j = bisect.bisect_right(self.fixed_keys, last)
+        for _, seq, data, date in self.fixed[i : j]:
+            candidates.append((0, seq, data, date))
+        for rank, y in enumerate((year, year + 1)):
+            leap = y % 400 == 0 or (y % 4 == 0 and not y % 100 == 0)
+            lo = max(first, datetime.date(y, 1, 1).toordinal())
+            hi = min(last, datetime.date(y, 12, 31).toordinal())
+            if lo > hi:
+                continue
+            lo, hi = datetime.date.fromordinal(lo), datetime.date.fromordinal(hi)
+            i = bisect.bisect_left(self.recurring_keys, lo.month * 32 + lo.day)
+            j = bisect.bisect_right(self.recurring_keys, hi.month * 32 + hi.day)
+            for key, seq, data, date in self.recurring[i : j]:
+                if key == 2 * 32 + 29 and not leap:
+                    continue
+                candidates.append((rank, seq, data, '%i-%s' % (y, date)))
+        candidates.sort(key = lambda x : x[:2])
         rc = []
-        more_events = []
-        for evs in (events, more_events):
-            for data, date in evs:
-                if len(date.split('-')) == 2:
-                    more_events.append((data, '%i-%s' % (year + 1, date)))
-                    date = '%i-%s' % (year, date)
-                date = time.strptime(date, '%Y-%m-%d')
-                days = (int(time.strftime('%s', date)) + tz) // a_day - now // a_day
-                if days >= 0 and days < inclusion_period:
-                    rc.append((data, days, date))
+        for _, _, data, date in candidates:
+            date = time.strptime(date, '%Y-%m-%d')
+            days = (int(time.strftime('%s', date)) + tz) // a_day - now // a_day
+            if days >= 0 and days < inclusion_period:
+                rc.append((data, days, date))
         rc.sort(key = lambda x : x[1])
         return rc
-    except Exception as e:
-        raise e
-        return None
 
 
 def first_weekday(weekday, first, extra_days = 0):
@@ -104,6 +172,209 @@ def western_easter(year):
     return (n, p + 1)
 
 
+def calendar_date(rule, year):
+    '''
+    Get the date a calendar rule gives for a year
+    
+    @param   rule:tuple  The rule, one of:
+                           ('date', month, day)
+                               A fixed date
+                           ('leapdate', month, day)
+                               A fixed date, that only occurs in leap years
+                           ('weekday', weekday, month, day, extra_days)
+                               The first `weekday` (0 for Monday, 6 for Sunday)
+                               on or after a fixed date, plus `extra_days` days
+                           ('week', month, week, extra_days)
+                               The Monday of the `week`:th week (1 for the
+                               week of the first day) of a month, plus
+                               `extra_days` days
+                           ('easter', extra_days)
+                               The Western Easter Sunday plus `extra_days` days
+    @param   year:int    The year
+    @return  :str?       The date in %Y-%m-%d format, `None` if the rule
+                         does not occur in the year
+    '''
+    import datetime
+    kind = rule[0]
+    if kind == 'date':
+        date = datetime.date(year, rule[1], rule[2])
+    elif kind == 'leapdate':
+        if not (year % 400 == 0 or (year % 4 == 0 and not year % 100 == 0)):
+            return None
+        date = datetime.date(year, rule[1], rule[2])
+    elif kind == 'weekday':
+        date = datetime.date(year, rule[2], rule[3])
+        date += datetime.timedelta(days = (rule[1] - date.weekday()) % 7 + rule[4])
+    elif kind == 'week':
+        date = datetime.date(year, rule[1], 1)
+        date += datetime.timedelta(days = 7 * (rule[2] - 1) - date.weekday() + rule[3])
+    elif kind == 'easter':
+        (mon, mday) = western_easter(year)
+        date = datetime.date(year, mon, 1) + datetime.timedelta(days = mday - 1 + rule[1])
+    else:
+        raise ValueError('unknown calendar rule: %s' % repr(rule))
+    return '%i-%02i-%02i' % (date.year, date.month, date.day)
+
+
+def compile_calendar(rules, year):
+    '''
+    Get the events a calendar gives for a year
+    
+    The result is remembered, so each calendar is
+    only compiled once per year
+    
+    @param   rules:tuple<(title:str, rule:tuple)>  The calendar, see `calendar_date` for
+                                                   the rules, `SWEDISH_HOLIDAYS` for
+                                                   an example
+    @param   year:int                              The year
+    @return  :tuple<(title:str, date:str)>         The events, in the order of `rules`,
+                                                   that occur in the year
+    '''
+    key = (rules, year)
+    if key not in compiled_calendars:
+        events = ((title, calendar_date(rule, year)) for title, rule in rules)
+        compiled_calendars[key] = tuple((title, date) for title, date in events if date is not None)
+    return compiled_calendars[key]
+
+# Calendars compiled by `compile_calendar`, (rules, year) → events
+compiled_calendars = {}
+
+
+def calendar_events(rules, first_year, last_year = None):
+    '''
+    Generate the events a calendar gives over a range of years
+    
+    @param   rules:tuple<(title:str, rule:tuple)>  The calendar, see `compile_calendar`
+    @param   first_year:int                        The first year
+    @param   last_year:int?                        The last year (inclusive), `None`
+                                                   to never stop generating events
+    @return  :itr<(title:str, date:str)>           The events, year by year, that can
+                                                   be filtered with `filter_events`
+    '''
+    year = first_year
+    while last_year is None or year <= last_year:
+        yield from compile_calendar(rules, year)
+        year += 1
+
+
+SWEDISH_HOLIDAYS = ( ('Nyårsdagen',             ('date', 1, 1))
+                   , ('Trettondedag jul',       ('date', 1, 6))
+                   , ('Första maj',             ('date', 5, 1))
+                   , ('Sveriges nationaldag',   ('date', 6, 6))
+                   , ('Juldagen',               ('date', 12, 25))
+                   , ('Annandag jul',           ('date', 12, 26))
+                   , ('Midsommardagen',         ('weekday', 5, 6, 20, 0))
+                   , ('Alla helgons dag',       ('weekday', 5, 10, 31, 0))
+                   , ('Annandag påsk',          ('easter', 1))
+                   , ('Långfredagen',           ('easter', -2))
+                   , ('Kristi himmelsfärdsdag', ('easter', 39))
+                   )
+
+SWEDISH_COMMON_EVENTS = ( ('Trettondagsafton',            ('date', 1, 5))
+                        , ('Alla hjärtans dag',           ('date', 2, 14))
+                        , ('Internationella kvinnodagen', ('date', 3, 8))
+                        , ('Första april',                ('date', 4, 1))
+                        , ('Valborgsmässoafton',          ('date', 4, 30))
+                        , ('Första maj',                  ('date', 5, 1))
+                        , ('Midsommarafton',              ('weekday', 4, 6, 19, 0))
+                        , ('Lucia',                       ('date', 12, 13))
+                        , ('Julafton',                    ('date', 12, 24))
+                        , ('Allhelgonaafton',             ('weekday', 4, 10, 30, 0))
+                        , ('Nyårsafton',                  ('date', 12, 31))
+                        , ('Skärtorsdagen',               ('easter', -3))
+                        , ('Påskdagen',                   ('easter', 0))
+                        , ('Påskafton',                   ('easter', -1))
+                        , ('Pingstdagen',                 ('easter', 49))
+                        , ('Pingstafton',                 ('easter', 48))
+                        , ('Fettisdagen',                 ('easter', -47))
+                        , ('Första söndagen i advent',    ('weekday', 6, 11, 27, 0))
+                        , ('Andra söndagen i advent',     ('weekday', 6, 12, 4, 0))
+                        , ('Tredje söndagen i advent',    ('weekday', 6, 12, 11, 0))
+                        , ('Fjärde söndagen i advent',    ('weekday', 6, 12, 18, 0))
+                        )
+
+SWEDISH_OTHER_EVENTS = ( ('Palmsöndagen',                                                 ('easter', -7))
+                       , ('Förintelsens minnesdag',                                       ('date', 1, 27))
+                       , ('Världsreligionsdagen',                                         ('weekday', 6, 1, 1, 6 * 7))
+                       , ('Darwindagen',                                                  ('date', 2, 12))
+                       , ('Internationella modersmålsdagen',                              ('date', 2, 21))
+                       , ('Föredetta skottdagen',                                         ('leapdate', 2, 24))
+                       , ('Kyndelsmässodagen',                                            ('date', 2, 2))
+                       , ('Sverigefinnarnas dag',                                         ('date', 2, 24))
+                       , ('Internationella vattendagen',                                  ('date', 3, 22))
+                       , ('Matematikens dag (Pi-dagen)',                                  ('date', 3, 14))
+                       , ('Nordens dag',                                                  ('date', 3, 23))
+                       , ('Jungfru Marie bebådelsedag',                                   ('weekday', 6, 3, 22, 0))
+                       , ('Världsböndagen för fred',                                      ('weekday', 4, 3, 1, 0))
+                       , ('Världspoesidagen',                                             ('date', 3, 21))
+                       , ('Dansens dag',                                                  ('date', 4, 29))
+                       , ('Försöksdjurens dag',                                           ('date', 4, 24))
+                       , ('Jordens dag',                                                  ('date', 4, 22))
+                       , ('Världens konstdag',                                            ('date', 4, 15))
+                       , ('Världshälsodagen',                                             ('date', 4, 7))
+                       , ('Europadagen/Segerdagen',                                       ('date', 5, 9))
+                       , ('Handduksdagen',                                                ('date', 5, 25))
+                       , ('Internationella dagen för biologisk mångfald',                 ('date', 5, 22))
+                       , ('Internationella familjedagen',                                 ('date', 5, 15))
+                       , ('Internationella fredssoldatdagen/Veterandagen',                ('date', 5, 29))
+                       , ('Jungfru Marie besökelsedag',                                   ('date', 5, 31))
+                       , ('Tobaksfria dagen',                                             ('date', 5, 31))
+                       , ('Världsdagen för pressfrihet',                                  ('date', 5, 3))
+                       , ('Internationella heraldikdagen',                                ('date', 6, 10))
+                       , ('Mobilfria dagen',                                              ('date', 6, 1))
+                       , ('Världsmiljödagen',                                             ('date', 6, 5))
+                       , ('Den helige Johannes Döparens dag',                             ('weekday', 6, 6, 21, 0))
+                       , ('Tau-dagen',                                                    ('date', 6, 28))
+                       , ('Mandeladagen',                                                 ('date', 7, 18))
+                       , ('Sjusovardagen',                                                ('date', 7, 27))
+                       , ('Victoriadagen',                                                ('date', 7, 14))
+                       , ('Alternative Pi-dagen',                                         ('date', 7, 22))
+                       , ('Europeisk minnesdag för stalinismens och nazismens offer',     ('date', 8, 23))
+                       , ('Jungfru Marie himmelsfärd',                                    ('date', 8, 15))
+                       , ('Raoul Wallenbergs dag',                                        ('date', 8, 27))
+                       , ('Vänsterhäntas dag',                                            ('date', 8, 13))
+                       , ('Det heliga korsets upphöjelse',                                ('date', 9, 14))
+                       , ('Europeiska språkdagen',                                        ('date', 9, 26))
+                       , ('Geologins dag',                                                ('weekday', 5, 9, 1, 7))
+                       , ('Internationella bilfria dagen',                                ('date', 9, 22))
+                       , ('Internationella fredsdagen',                                   ('date', 9, 21))
+                       , ('Jungfru Marie födelse',                                        ('date', 9, 8))
+                       , ('Jungfru Marie heliga namn',                                    ('date', 9, 12))
+                       , ('Software Freedom Day',                                         ('date', 9, 19))
+                       , ('Djurens dag',                                                  ('date', 10, 4))
+                       , ('FN-dagen',                                                     ('date', 10, 24))
+                       , ('Internationella dagen för utrotande av fattigdom',             ('date', 10, 17))
+                       , ('Internationella flickdagen',                                   ('date', 10, 11))
+                       , ('Internationella handtvättsdagen',                              ('date', 10, 15))
+                       , ('Internationella stamningsdagen',                               ('date', 10, 22))
+                       , ('Kanelbullens dag',                                             ('date', 10, 4))
+                       , ('Lantbruksdjurens dag',                                         ('date', 10, 2))
+                       , ('Vegetariska världsdagen',                                      ('date', 10, 1))
+                       , ('Världshungerdagen',                                            ('date', 10, 16))
+                       , ('Alla själars dag',                                             ('date', 11, 2))
+                       , ('Allhelgonadagen',                                              ('date', 11, 1))
+                       , ('Arkivens dag',                                                 ('weekday', 5, 11, 1, 7))
+                       , ('Gustav Adolfsdagen',                                           ('date', 11, 6))
+                       , ('Internationella dagen mot våld mot kvinnor',                   ('date', 11, 25)) # déjà vu...
+                       , ('Internationella filosofidagen',                                ('weekday', 3, 11, 1, 2 * 7))
+                       , ('Internationella mansdagen',                                    ('date', 11, 19))
+                       , ('Internationella solidaritetsdagen med det palestinska folket', ('date', 11, 29))
+                       , ('Internationella vegandagen',                                   ('date', 11, 1)) # demi-déju vu...
+                       , ('Kåldolmens dag',                                               ('date', 11, 30))
+                       , ('Mårtensafton',                                                 ('date', 11, 10))
+                       , ('Stilleståndsdagen',                                            ('date', 11, 11))
+                       , ('Världsdiabetesdagen',                                          ('date', 11, 14))
+                       , ('Söndagen före domssöndagen',                                   ('weekday', 6, 11, 13, 0))
+                       , ('Söndagen efter Alla helgons dag',                              ('weekday', 5, 10, 31, 1))
+                       , ('Internationella GIS-dagen',                                    ('week', 10, 3, 0))
+                       , ('Internationella dagen för mänskliga rättigheter',              ('date', 12, 10))
+                       , ('Internationella volontärdagen',                                ('date', 12, 5))
+                       , ('Tangons dag',                                                  ('date', 12, 11))
+                       , ('Världs-AIDS-dagen',                                            ('date', 12, 1))
+                       , ('Värnlösa barns dag',                                           ('date', 12, 28))
+                       )
+
+
 def swedish_holidays():
     '''
     Return a list of Swedish holidays than can be filtered with `filter_events`
@@ -112,20 +383,7 @@ def swedish_holidays():
     '''
     import time
     year = time.localtime().tm_year
-    rc = []
-    for y in (year, year + 1):
-        (em, ed) = western_easter(y)
-        rc.append(('Nyårsdagen',             '%i-01-01' % y))
-        rc.append(('Trettondedag jul',       '%i-01-06' % y))
-        rc.append(('Första maj',             '%i-05-01' % y))
-        rc.append(('Sveriges nationaldag',   '%i-06-06' % y))
-        rc.append(('Juldagen',               '%i-12-25' % y))
-        rc.append(('Annandag jul',           '%i-12-26' % y))
-        rc.append(('Midsommardagen',         first_weekday(5, '%i-06-20' % y)))
-        rc.append(('Alla helgons dag',       first_weekday(5, '%i-10-31' % y)))
-        rc.append(('Annandag påsk',          date_to_string(y, em, ed + 1)))
-        rc.append(('Långfredagen',           date_to_string(y, em, ed - 2)))
-        rc.append(('Kristi himmelsfärdsdag', date_to_string(y, em, ed + 4 + 5 * 7)))
+    rc = list(calendar_events(SWEDISH_HOLIDAYS, year, year + 1))
     rc.sort(key = lambda x : x[1])
     return rc
 
@@ -146,108 +404,8 @@ def swedish_events(only_common = False):
     year = time.localtime().tm_year
     rc = []
     for y in (year, year + 1):
-        (em, ed) = western_easter(y)
-        rc.append(('Trettondagsafton',            '%i-01-05' % y))
-        rc.append(('Alla hjärtans dag',           '%i-02-14' % y))
-        rc.append(('Internationella kvinnodagen', '%i-03-08' % y))
-        rc.append(('Första april',                '%i-04-01' % y))
-        rc.append(('Valborgsmässoafton',          '%i-04-30' % y))
-        rc.append(('Första maj',                  '%i-05-01' % y))
-        rc.append(('Midsommarafton',              first_weekday(4, '%i-06-19' % y)))
-        rc.append(('Lucia',                       '%i-12-13' % y))
-        rc.append(('Julafton',                    '%i-12-24' % y))
-        rc.append(('Allhelgonaafton',             first_weekday(4, '%i-10-30' % y)))
-        rc.append(('Nyårsafton',                  '%i-12-31' % y))
-        rc.append(('Skärtorsdagen',               date_to_string(y, em, ed - 3)))
-        rc.append(('Påskdagen',                   date_to_string(y, em, ed)))
-        rc.append(('Påskafton',                   date_to_string(y, em, ed - 1)))
-        rc.append(('Pingstdagen',                 date_to_string(y, em, ed + 7 * 7)))
-        rc.append(('Pingstafton',                 date_to_string(y, em, ed + 7 * 7 - 1)))
-        rc.append(('Fettisdagen',                 date_to_string(y, em, ed - 47)))
-        rc.append(('Första söndagen i advent',    first_weekday(6, '%i-11-27' % y)))
-        rc.append(('Andra söndagen i advent',     first_weekday(6, '%i-12-04' % y)))
-        rc.append(('Tredje söndagen i advent',    first_weekday(6, '%i-12-11' % y)))
-        rc.append(('Fjärde söndagen i advent',    first_weekday(6, '%i-12-18' % y)))
+        rc.extend(compile_calendar(SWEDISH_COMMON_EVENTS, y))
         if not only_common:
-            rc.append(('Palmsöndagen',                                  date_to_string(y, em, ed - 7)))
-            rc.append(('Förintelsens minnesdag',                        '%i-01-27' % y))
-            rc.append(('Världsreligionsdagen',                          first_weekday(6, '%i-01-01' % y, 6 * 7)))
-            rc.append(('Darwindagen',                                   '%i-02-12' % y))
-            rc.append(('Internationella modersmålsdagen',               '%i-02-21' % y))
-            if y % 400 == 0 or (y % 4 == 0 and not y % 100 == 0):
-                rc.append(('Föredetta skottdagen',                      '%i-02-24' % y))
-            rc.append(('Kyndelsmässodagen',                             '%i-02-02' % y))
-            rc.append(('Sverigefinnarnas dag',                          '%i-02-24' % y))
-            rc.append(('Internationella vattendagen',                   '%i-03-22' % y))
-            rc.append(('Matematikens dag (Pi-dagen)',                   '%i-03-14' % y))
-            rc.append(('Nordens dag',                                   '%i-03-23' % y))
-            rc.append(('Jungfru Marie bebådelsedag',                    first_weekday(6, '%i-03-22' % y)))
-            rc.append(('Världsböndagen för fred',                       first_weekday(4, '%i-03-01' % y)))
-            rc.append(('Världspoesidagen',                              '%i-03-21' % y))
-            rc.append(('Dansens dag',                                   '%i-04-29' % y))
-            rc.append(('Försöksdjurens dag',                            '%i-04-24' % y))
-            rc.append(('Jordens dag',                                   '%i-04-22' % y))
-            rc.append(('Världens konstdag',                             '%i-04-15' % y))
-            rc.append(('Världshälsodagen',                              '%i-04-07' % y))
-            rc.append(('Europadagen/Segerdagen',                        '%i-05-09' % y))
-            rc.append(('Handduksdagen',                                 '%i-05-25' % y))
-            rc.append(('Internationella dagen för biologisk mångfald',  '%i-05-22' % y))
-            rc.append(('Internationella familjedagen',                  '%i-05-15' % y))
-            rc.append(('Internationella fredssoldatdagen/Veterandagen', '%i-05-29' % y))
-            rc.append(('Jungfru Marie besökelsedag',                    '%i-05-31' % y))
-            rc.append(('Tobaksfria dagen',                              '%i-05-31' % y))
-            rc.append(('Världsdagen för pressfrihet',                   '%i-05-03' % y))
-            rc.append(('Internationella heraldikdagen',                 '%i-06-10' % y))
-            rc.append(('Mobilfria dagen',                               '%i-06-01' % y))
-            rc.append(('Världsmiljödagen',                              '%i-06-05' % y))
-            rc.append(('Den helige Johannes Döparens dag',              first_weekday(6, '%i-06-21' % y)))
-            rc.append(('Tau-dagen',                                     '%i-06-28' % y))
-            rc.append(('Mandeladagen',                                  '%i-07-18' % y))
-            rc.append(('Sjusovardagen',                                 '%i-07-27' % y))
-            rc.append(('Victoriadagen',                                 '%i-07-14' % y))
-            rc.append(('Alternative Pi-dagen',                          '%i-07-22' % y))
-            rc.append(('Europeisk minnesdag för stalinismens och nazismens offer', '%i-08-23' % y))
-            rc.append(('Jungfru Marie himmelsfärd',                     '%i-08-15' % y))
-            rc.append(('Raoul Wallenbergs dag',                         '%i-08-27' % y))
-            rc.append(('Vänsterhäntas dag',                             '%i-08-13' % y))
-            rc.append(('Det heliga korsets upphöjelse',                 '%i-09-14' % y))
-            rc.append(('Europeiska språkdagen',                         '%i-09-26' % y))
-            rc.append(('Geologins dag',                                 first_weekday(5, '%i-09-01' % y, 7)))
-            rc.append(('Internationella bilfria dagen',                 '%i-09-22' % y))
-            rc.append(('Internationella fredsdagen',                    '%i-09-21' % y))
-            rc.append(('Jungfru Marie födelse',                         '%i-09-08' % y))
-            rc.append(('Jungfru Marie heliga namn',                     '%i-09-12' % y))
-            rc.append(('Software Freedom Day',                          '%i-09-19' % y))
-            rc.append(('Djurens dag',                                   '%i-10-04' % y))
-            rc.append(('FN-dagen',                                      '%i-10-24' % y))
-            rc.append(('Internationella dagen för utrotande av fattigdom', '%i-10-17' % y))
-            rc.append(('Internationella flickdagen',                    '%i-10-11' % y))
-            rc.append(('Internationella handtvättsdagen',               '%i-10-15' % y))
-            rc.append(('Internationella stamningsdagen',                '%i-10-22' % y))
-            rc.append(('Kanelbullens dag',                              '%i-10-04' % y))
-            rc.append(('Lantbruksdjurens dag',                          '%i-10-02' % y))
-            rc.append(('Vegetariska världsdagen',                       '%i-10-01' % y))
-            rc.append(('Världshungerdagen',                             '%i-10-16' % y))
-            rc.append(('Alla själars dag',                              '%i-11-02' % y))
-            rc.append(('Allhelgonadagen',                               '%i-11-01' % y))
-            rc.append(('Arkivens dag',                                  first_weekday(5, '%i-11-01' % y, 7)))
-            rc.append(('Gustav Adolfsdagen',                            '%i-11-06' % y))
-            rc.append(('Internationella dagen mot våld mot kvinnor',    '%i-11-25' % y)) # déjà vu...
-            rc.append(('Internationella filosofidagen',                 first_weekday(3, '%i-11-01' % y, 2 * 7)))
-            rc.append(('Internationella mansdagen',                     '%i-11-19' % y))
-            rc.append(('Internationella solidaritetsdagen med det palestinska folket', '%i-11-29' % y))
-            rc.append(('Internationella vegandagen',                    '%i-11-01' % y)) # demi-déju vu...
-            rc.append(('Kåldolmens dag',                                '%i-11-30' % y))
-            rc.append(('Mårtensafton',                                  '%i-11-10' % y))
-            rc.append(('Stilleståndsdagen',                             '%i-11-11' % y))
-            rc.append(('Världsdiabetesdagen',                           '%i-11-14' % y))
-            rc.append(('Söndagen före domssöndagen',                    first_weekday(6, '%i-11-13' % y)))
-            rc.append(('Söndagen efter Alla helgons dag',               first_weekday(5, '%i-10-31' % y, 1)))
-            rc.append(('Internationella GIS-dagen',                     weekday_in_week(2, y, 10, 3)))
-            rc.append(('Internationella dagen för mänskliga rättigheter', '%i-12-10' % y))
-            rc.append(('Internationella volontärdagen',                 '%i-12-05' % y))
-            rc.append(('Tangons dag',                                   '%i-12-11' % y))
-            rc.append(('Världs-AIDS-dagen',                             '%i-12-01' % y))
-            rc.append(('Värnlösa barns dag',                            '%i-12-28' % y))
+            rc.extend(compile_calendar(SWEDISH_OTHER_EVENTS, y))
     rc.sort(key = lambda x : x[1])
     return rc
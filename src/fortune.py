@@ -5,6 +5,12 @@ def fortune(max_lines = 5, max_columns = 80, max_tries = 100, file = None):
     '''
     Get random fortune quote
     
+    The quote is read directly from the fortune files, and is chosen
+    uniformly among the quotes that are small enough, using their
+    strfile(8) .dat files and an index of the size of each quote that
+    is cached in $XDG_CACHE_HOME/rotd/fortune. fortune(6) is only run,
+    and only up to `max_tries` times, if no .dat files can be found.
+    
     @param   max_lines:int    The maximum number of lines the quote may continue
     @param   max_columns:int  The maximum number of columns the quote may require
     @param   max_tries:int    The maximum number of tries before giving up
@@ -12,9 +18,18 @@ def fortune(max_lines = 5, max_columns = 80, max_tries = 100, file = None):
     @return  :(str?, :int)    The quote in plain text, `None` on error, and
                               the number of tries left (0 if first element is `None`)
     '''
+    try:
+        import random
+        files = fortune_files(file)
+        if len(files) > 0:
+            candidates = fortune_candidates(files, max_lines, max_columns)
+            if len(candidates) == 0 or max_tries < 1:
+                return (None, 0)
+            return (fortune_quote(*random.choice(candidates)), max_tries - 1)
+    except:
+        pass
     try:
         from subprocess import Popen, PIPE
-        import time
         for tries in range(max_tries):
             proc = Popen(['fortune', file] if file is not None else ['fortune'], stdout = PIPE)
             output = proc.communicate()[0].decode('utf-8', 'strict')
@@ -24,3 +39,186 @@ def fortune(max_lines = 5, max_columns = 80, max_tries = 100, file = None):
     except:
         pass
     return (None, 0)
+
+
+def fortune_files(file = None):
+    '''
+    Get the fortune files that fortune(6) would choose from
+    
+    @param   file:str?        The file, or directory, given to fortune(6), `None`
+                              for all files in the default fortune directory
+    @return  :list<str>       The pathnames of the fortune files that have
+                              a .dat file, sorted
+    '''
+    import os
+    if file is None:
+        paths = [d for d in FORTUNE_DIRS if os.path.isdir(d)][:1]
+    elif file.startswith('/') or os.path.exists(file):
+        paths = [file]
+    else:
+        paths = [p for p in ('%s/%s' % (d, file) for d in FORTUNE_DIRS) if os.path.exists(p) or os.path.exists(p + '.dat')][:1]
+    rc = []
+    for path in paths:
+        if os.path.isdir(path):
+            names = ['%s/%s' % (path, f) for f in os.listdir(path) if '.' not in f]
+        else:
+            names = [path]
+        rc += [f for f in names if os.path.isfile(f) and os.path.isfile(f + '.dat')]
+    return sorted(rc)
+
+
+def fortune_index(filename):
+    '''
+    Get the index of a fortune file, the index is built only if
+    the file or its .dat file has been modified since it was cached
+    
+    @param   filename:str  The pathname of the fortune file
+    @return  :dict         'offsets': the offset, in the fortune file, of each
+                           quote, and of the end of the last quote; 'lines':
+                           the number of lines in each quote; 'columns': the
+                           width of the longest line in each quote, -1 if the
+                           quote is not UTF-8; 'delim': the delimiter character;
+                           'rotated': whether the quotes are encoded with ROT13;
+                           'comments': whether lines beginning with two
+                           delimiters are comments
+    '''
+    import os
+    key = [filename] + [[s.st_mtime_ns, s.st_size] for s in (os.stat(filename), os.stat(filename + '.dat'))]
+    if filename in fortune_indices and fortune_indices[filename]['key'] == key:
+        return fortune_indices[filename]
+    from __main__ import cachedir
+    import json, mmap, struct, hashlib, threading
+    cache = '%s/%s.json' % (cachedir('fortune'), hashlib.sha256(filename.encode('utf-8')).hexdigest())
+    try:
+        with open(cache, 'rb') as file:
+            index = json.loads(file.read().decode('utf-8', 'strict'))
+        if index['key'] == key:
+            fortune_indices[filename] = index
+            return index
+    except:
+        pass
+    with open(filename + '.dat', 'rb') as file:
+        dat = file.read()
+    _, count, _, _, flags = struct.unpack('>5L', dat[:20])
+    width = 8 if len(dat) >= 24 + (count + 1) * 8 else 4
+    offsets = list(struct.unpack('>%i%s' % (count + 1, 'LQ'[width // 8]), dat[24 : 24 + (count + 1) * width]))
+    offsets.sort()
+    index = { 'key'      : key
+            , 'offsets'  : offsets
+            , 'lines'    : []
+            , 'columns'  : []
+            , 'delim'    : chr(dat[20])
+            , 'rotated'  : (flags & STR_ROTATED) != 0
+            , 'comments' : (flags & STR_COMMENTS) != 0
+            }
+    with open(filename, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as data:
+            for i in range(count):
+                try:
+                    lines = quote_text(data[offsets[i] : offsets[i + 1]], index).split('\n')
+                    index['lines'].append(len(lines))
+                    index['columns'].append(max(len(line) for line in lines))
+                except UnicodeDecodeError:
+                    index['lines'].append(0)
+                    index['columns'].append(-1)
+    temp = '%s~%i.%i' % (cache, os.getpid(), threading.get_ident())
+    try:
+        with open(temp, 'wb') as file:
+            file.write(json.dumps(index).encode('utf-8'))
+            file.flush()
+        os.rename(temp, cache)
+    except OSError:
+        pass
+    fortune_indices[filename] = index
+    return index
+
+
+def fortune_candidates(files, max_lines, max_columns):
+    '''
+    Get all quotes that are small enough
+    
+    @param   files:list<str>        The fortune files
+    @param   max_lines:int          The maximum number of lines the quote may continue
+    @param   max_columns:int        The maximum number of columns the quote may require
+    @return  :list<(str, int)>      The fortune file and the index
+                                    in the file of each quote
+    '''
+    key = (tuple(files), max_lines, max_columns)
+    indices = [fortune_index(filename) for filename in files]
+    stamps = [index['key'] for index in indices]
+    if key not in fortune_candidate_lists or fortune_candidate_lists[key][0] != stamps:
+        rc = []
+        for filename, index in zip(files, indices):
+            for i, (lines, columns) in enumerate(zip(index['lines'], index['columns'])):
+                if 0 <= columns <= max_columns and lines <= max_lines:
+                    rc.append((filename, i))
+        fortune_candidate_lists[key] = (stamps, rc)
+    return fortune_candidate_lists[key][1]
+
+
+def fortune_quote(filename, i):
+    '''
+    Read a quote from a fortune file
+    
+    @param   filename:str  The fortune file
+    @param   i:int         The index of the quote in the file
+    @return  :str          The quote, as printed by fortune(6)
+    '''
+    import mmap
+    index = fortune_index(filename)
+    with open(filename, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as data:
+            return quote_text(data[index['offsets'][i] : index['offsets'][i + 1]], index)
+
+
+def quote_text(data, index):
+    '''
+    Decode a quote, as it is stored in a fortune file
+    
+    @param   data:bytes  The quote, including the delimiter line after it
+    @param   index:dict  The index of the fortune file, see `fortune_index`
+    @return  :str        The quote, as printed by fortune(6)
+    '''
+    import codecs
+    text = data.decode('utf-8', 'strict')
+    delim = index['delim']
+    lines = text.split('\n')
+    if lines[-1] == '':
+        lines = lines[:-1]
+    if len(lines) > 0 and lines[-1] == delim:
+        lines = lines[:-1]
+    if index['comments']:
+        lines = [line for line in lines if not line.startswith(delim * 2)]
+    text = ''.join(line + '\n' for line in lines)
+    return codecs.decode(text, 'rot13') if index['rotated'] else text
+
+
+# Directories fortune(6) may look for fortune files in
+FORTUNE_DIRS = ('/usr/share/games/fortunes', '/usr/share/fortune', '/usr/share/fortunes',
+                '/usr/share/games/fortune', '/usr/games/lib/fortunes', '/usr/local/share/games/fortunes')
+
+# Flags in strfile(8) .dat files
+STR_ROTATED = 0x4
+STR_COMMENTS = 0x8
+
+# Indices of fortune files, by pathname
+fortune_indices = {}
+
+# Return values of `fortune_candidates`, by its arguments, together
+# with the keys of the indices they were made from
+fortune_candidate_lists = {}
+
+
+def fortune_async(max_lines = 5, max_columns = 80, max_tries = 100, file = None):
+    '''
+    Start `fortune` in the background
+    
+    @param   max_lines:int          The maximum number of lines the quote may continue
+    @param   max_columns:int        The maximum number of columns the quote may require
+    @param   max_tries:int          The maximum number of tries before giving up
+    @param   file:str?              The file from which to take the quote
+    @return  :Future<(str?, :int)>  The future return value of `fortune`
+    '''
+    from __main__ import defer
+    return defer(fortune, max_lines = max_lines, max_columns = max_columns,
+                 max_tries = max_tries, file = file)
@@ -1,32 +1,182 @@
 # -*- python -*-
 # See LICENSE file for copyright and license details.
 
-def gnupg_expiry(warn_period = 30):
+def gnupg_expiry(warn_period = 30, homedirs = None, public_keys = (), abort_timer = 10):
     '''
-    Get a list of all secret keys that will expire soon
+    Get a list of all secret keys, and selected public keys, that will expire soon
     
-    @param   warn_peroid:int     The number of days to warn before the key expires
-    @return  :list<(str, int)>?  List of key–days pairs. Each element is 2-tuple,
-                                 where the first tuple-element is the key ID, and
-                                 then second tuple-element is the number of days
-                                 before the key exires. `None` is returned on error.
+    Subkeys are included, revoked and disabled keys are not. The keys are
+    listed by gpg, in its machine-readable format, for all `homedirs` at
+    once, and the listings are cached in $XDG_CACHE_HOME/rotd/gnupg until
+    the keyring files are modified, so gpg is not started at all if
+    no keyring has changed.
+    
+    @param   warn_peroid:int              The number of days to warn before the key expires
+    @param   homedirs:itr<str>?           The GnuPG home directories to look for keys in,
+                                          `None` for only $GNUPGHOME, or ~/.gnupg
+    @param   public_keys:itr<str>|bool    The fingerprints or key IDs of public keys
+                                          to warn about, `True` for all public keys
+    @param   abort_timer:int              The number of seconds to wait for gpg before giving up
+    @return  :list<(str, int)>?           List of key–days pairs. Each element is 2-tuple,
+                                          where the first tuple-element is the key ID, and
+                                          then second tuple-element is the number of days
+                                          before the key exires. `None` is returned on error.
+                                          For a subkey, the key ID is the fingerprint of the
+                                          primary key, followed by ' subkey ' and the
+                                          fingerprint of the subkey.
     '''
     try:
-        from subprocess import Popen, PIPE
         import time
-        proc = Popen(['gpg', '--list-secret-keys'], stdout = PIPE)
-        output = proc.communicate()[0].decode('utf-8', 'strict')
-        output = output.split('\n')
-        output = [(x, output[i + 1]) for i, x in enumerate(output) if x.startswith('sec') and 'expires: ' in x]
-        output = [(y.strip(), x.split('expires: ')[1][:10]) for x, y in output]
+        if homedirs is None:
+            homedirs = [gnupg_home()]
+        tables = gnupg_keys(homedirs, public_keys is not True and len(public_keys) == 0, abort_timer)
+        if all(table is None for table in tables):
+            return None
+        wanted = [k.upper() for k in public_keys] if public_keys is not True else None
+        def depended_on(fingerprint, keyid):
+            return wanted is None or any(fingerprint.endswith(k) or keyid.endswith(k) for k in wanted)
+        expiries = {}
+        for table in tables:
+            if table is None:
+                continue
+            for kind, fingerprint, primary, keyid, expires in table:
+                if kind in ('pub', 'sub') and not depended_on(primary, keyid):
+                    continue
+                key = primary if fingerprint == primary else '%s subkey %s' % (primary, fingerprint)
+                expiries[key] = expires
         rc = []
         now = time.time() // (60 * 60 * 24)
-        for key, expiry in output:
-            expiry = int(time.strftime('%s', time.strptime(expiry + ' UTC', '%Y-%m-%d %Z')))
+        for key, expiry in expiries.items():
             expiry = expiry // (60 * 60 * 24) - now
             if expiry >= 0 and expiry < warn_period:
-                rc.append((key, expiry))
+                rc.append((key, int(expiry)))
         rc.sort(key = lambda x : x[1])
         return rc
     except:
         return None
+
+
+def gnupg_home():
+    '''
+    Get the default GnuPG home directory
+    
+    @return  :str  $GNUPGHOME, or ~/.gnupg
+    '''
+    import os
+    return os.environ.get('GNUPGHOME', '') or os.path.expanduser('~/.gnupg')
+
+
+def gnupg_keys(homedirs, secret_only = True, abort_timer = 10):
+    '''
+    List the keys, that have an expiry date, in GnuPG home directories
+    
+    @param   homedirs:itr<str>    The GnuPG home directories
+    @param   secret_only:bool     Should public keys without a secret key be left out?
+    @param   abort_timer:int      The number of seconds to wait for gpg before giving up
+    @return  :list<list<(kind:str, fingerprint:str, primary:str, keyid:str, expires:int)>?>
+                                  For each home directory, the keys, `None` if they
+                                  could not be listed. `kind` is 'sec', 'ssb', 'pub',
+                                  or 'sub', `fingerprint` is the fingerprint of the
+                                  key, `primary` is the fingerprint of its primary key,
+                                  `keyid` is the long key ID of the key, and
+                                  `expires` is the POSIX time the key expires.
+    '''
+    from __main__ import cachedir, spawn_many
+    import os, json, threading
+    homedirs = [os.path.abspath(os.path.expanduser(h)) for h in homedirs]
+    modes = ['secret'] if secret_only else ['secret', 'public']
+    cache = '%s/keys.json' % cachedir('gnupg')
+    try:
+        with open(cache, 'rb') as file:
+            cached = json.loads(file.read().decode('utf-8', 'strict'))
+    except:
+        cached = {}
+    rc, stamps, cmds = [], {}, []
+    for homedir in homedirs:
+        stamp = []
+        for f in GNUPG_KEYRING_FILES:
+            try:
+                stamp.append(os.stat('%s/%s' % (homedir, f)).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        stamps[homedir] = stamp
+        entry = cached.get(homedir, None)
+        if not os.path.isdir(homedir):
+            rc.append([])
+        elif entry is not None and entry['stamp'] == stamp and all(mode in entry for mode in modes):
+            rc.append([tuple(key) for mode in modes for key in entry[mode]])
+        else:
+            rc.append(None)
+            for mode in modes:
+                cmds.append((homedir, mode, ['gpg', '--homedir', homedir, '--batch', '--with-colons',
+                                             '--fixed-list-mode', '--list-%s-keys' % mode]))
+    if len(cmds) == 0:
+        return rc
+    results = spawn_many([cmd for _, _, cmd in cmds], abort_timer = abort_timer, get_stderr = True)
+    listings = {}
+    for (homedir, mode, _), (status, output, _) in zip(cmds, results):
+        keys = parse_colons(output.decode('utf-8', 'replace')) if status == 0 else None
+        listings.setdefault(homedir, {})[mode] = keys
+    for homedir, listing in listings.items():
+        if any(keys is None for keys in listing.values()):
+            continue
+        listing['stamp'] = stamps[homedir]
+        cached[homedir] = listing
+        rc[homedirs.index(homedir)] = [tuple(key) for mode in modes for key in listing[mode]]
+    temp = '%s~%i.%i' % (cache, os.getpid(), threading.get_ident())
+    try:
+        with open(temp, 'wb') as file:
+            file.write(json.dumps(cached).encode('utf-8'))
+            file.flush()
+        os.rename(temp, cache)
+    except OSError:
+        pass
+    return rc
+
+
+def parse_colons(output):
+    '''
+    Parse the output of gpg --with-colons --fixed-list-mode --list-keys
+    
+    @param   output:str  The output
+    @return  :list<(kind:str, fingerprint:str, primary:str, keyid:str, expires:int)>
+                         The keys that have an expiry date and are not
+                         revoked or disabled, see `gnupg_keys`
+    '''
+    import calendar, time
+    rc, key, primary, usable = [], None, None, False
+    for line in output.split('\n'):
+        fields = line.split(':')
+        if fields[0] in ('sec', 'pub', 'ssb', 'sub') and len(fields) > 11:
+            key, expires = fields, fields[6]
+            if 'T' in expires:
+                expires = calendar.timegm(time.strptime(expires, '%Y%m%dT%H%M%S'))
+            key[6] = int(expires) if expires != '' else None
+            if fields[0] in ('sec', 'pub'):
+                primary, usable = None, fields[1] not in ('r', 'd') and 'D' not in fields[11]
+        elif fields[0] == 'fpr' and key is not None and len(fields) > 9:
+            if key[0] in ('sec', 'pub'):
+                primary = fields[9]
+            if usable and primary is not None and key[1] != 'r' and key[6] is not None:
+                rc.append((key[0], fields[9], primary, key[4], key[6]))
+            key = None
+    return rc
+
+
+# The files in a GnuPG home directory that keys are stored in
+GNUPG_KEYRING_FILES = ('pubring.kbx', 'pubring.gpg', 'secring.gpg', 'private-keys-v1.d')
+
+
+def gnupg_expiry_async(warn_period = 30, homedirs = None, public_keys = (), abort_timer = 10):
+    '''
+    Start `gnupg_expiry` in the background
+    
+    @param   warn_peroid:int             The number of days to warn before the key expires
+    @param   homedirs:itr<str>?          See `gnupg_expiry`
+    @param   public_keys:itr<str>|bool   See `gnupg_expiry`
+    @param   abort_timer:int             See `gnupg_expiry`
+    @return  :Future<list<(str, int)>?>  The future return value of `gnupg_expiry`
+    '''
+    from __main__ import defer
+    return defer(gnupg_expiry, warn_period = warn_period, homedirs = homedirs,
+                 public_keys = public_keys, abort_timer = abort_timer)
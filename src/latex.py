@@ -1,23 +1,35 @@
 # -*- python -*-
 # See LICENSE file for copyright and license details.
 
+# The markup the helpers produce: 'latex', 'html', 'markdown', or 'text',
+# it is selected by rotd, from the output file, before the config is run
+backend = 'latex'
+
 def documentclass(docclass, *vargs, **kwargs):
+    if backend != 'latex':
+        return ''
     opt = ','.join([str(x) for x in vargs] + ['%s=%s' % (k, str(kwargs[k])) for k in kwargs])
     if not opt == '':
         opt = '[' + opt + ']'
     return '\\documentclass%s{%s}\n' % (opt, docclass)
 
 def usepackage(pkg, *vargs, **kwargs):
+    if backend != 'latex':
+        return ''
     opt = ','.join([str(x) for x in vargs] + ['%s=%s' % (k, str(kwargs[k])) for k in kwargs])
     if not opt == '':
         opt = '[' + opt + ']'
     return '\\usepackage%s{%s}\n' % (opt, pkg)
 
 def fontencoding(enc = 'T1'):
+    if backend != 'latex':
+        return ''
     return '\\fontencoding{%s}\n' % enc
 
 
 def pagestyle(style, *vargs, **kwargs):
+    if backend != 'latex':
+        return ''
     opt = ','.join([str(x) for x in vargs] + ['%s=%s' % (k, str(kwargs[k])) for k in kwargs])
     if not opt == '':
         opt = '[' + opt + ']'
@@ -26,91 +38,737 @@ def pagestyle(style, *vargs, **kwargs):
 
 
 def begin(cmd, *vargs):
+    if backend != 'latex':
+        start = ENVIRONMENTS[backend].get(str(cmd), ENVIRONMENTS[backend][None])[0]
+        return start(*vargs) if callable(start) else start
     opt = ''.join('{' + str(x) + '}' for x in vargs)
     return '\\begin{%s}%s' % (str(cmd), opt)
 def end(cmd):
+    if backend != 'latex':
+        return ENVIRONMENTS[backend].get(str(cmd), ENVIRONMENTS[backend][None])[1]
     return '\\end{%s}' % str(cmd)
 
 
 def ln(*text):
-    return '\n'.join(text) + '\\\\\n'
+    return '\n'.join(text) + LINE_BREAKS[backend]
+
+def row(*cells):
+    if backend == 'html':
+        return '<tr>%s</tr>\n' % ''.join('<td>%s</td>' % str(c) for c in cells)
+    elif backend == 'markdown':
+        return '| %s |\n' % ' | '.join(str(c) for c in cells)
+    elif backend == 'text':
+        return '  '.join(str(c) for c in cells).rstrip(' ') + '\n'
+    return ' & '.join(str(c) for c in cells) + '\\\\\n'
 
 
 def Huge(text, end = '\n'):
-    return '{\\Huge %s}%s' % (str(text), str(end))
+    return markup('Huge', text, end)
 def huge(text, end = '\n'):
-    return '{\\huge %s}%s' % (str(text), str(end))
+    return markup('huge', text, end)
 def LARGE(text, end = '\n'):
-    return '{\\LARGE %s}%s' % (str(text), str(end))
+    return markup('LARGE', text, end)
 def Large(text, end = '\n'):
-    return '{\\Large %s}%s' % (str(text), str(end))
+    return markup('Large', text, end)
 def large(text, end = '\n'):
-    return '{\\large %s}%s' % (str(text), str(end))
+    return markup('large', text, end)
 def normalsize(text, end = '\n'):
-    return '{\\normalsize %s}%s' % (str(text), str(end))
+    return markup('normalsize', text, end)
 def small(text, end = '\n'):
-    return '{\\small %s}%s' % (str(text), str(end))
+    return markup('small', text, end)
 def footnotesize(text, end = '\n'):
-    return '{\\footnotesize %s}%s' % (str(text), str(end))
+    return markup('footnotesize', text, end)
 def scriptsize(text, end = '\n'):
-    return '{\\scriptsize %s}%s' % (str(text), str(end))
+    return markup('scriptsize', text, end)
 def tiny(text, end = '\n'):
-    return '{\\tiny %s}%s' % (str(text), str(end))
+    return markup('tiny', text, end)
 
 
 def normal(text, end = '\n'):
-    return '\\textnormal{%s}%s' % (str(text), str(end))
+    return markup('normal', text, end)
 def emph(text, end = '\n'):
-    return '\\emph{%s}%s' % (str(text), str(end))
+    return markup('emph', text, end)
 def rm(text, end = '\n'):
-    return '\\textrm{%s}%s' % (str(text), str(end))
+    return markup('rm', text, end)
 def sf(text, end = '\n'):
-    return '\\textsf{%s}%s' % (str(text), str(end))
+    return markup('sf', text, end)
 def tt(text, end = '\n'):
-    return '\\texttt{%s}%s' % (str(text), str(end))
+    return markup('tt', text, end)
 def up(text, end = '\n'):
-    return '\\textup{%s}%s' % (str(text), str(end))
+    return markup('up', text, end)
 def it(text, end = '\n'):
-    return '\\textit{%s}%s' % (str(text), str(end))
+    return markup('it', text, end)
 def sl(text, end = '\n'):
-    return '\\textsl{%s}%s' % (str(text), str(end))
+    return markup('sl', text, end)
 def sc(text, end = '\n'):
-    return '\\textsc{%s}%s' % (str(text), str(end))
+    return markup('sc', text, end)
 def uppercase(text, end = '\n'):
-    return '\\uppercase{%s}%s' % (str(text), str(end))
+    return markup('uppercase', text, end)
 def bf(text, end = '\n'):
-    return '\\textbf{%s}%s' % (str(text), str(end))
+    return markup('bf', text, end)
 def md(text, end = '\n'):
-    return '\\textmd{%s}%s' % (str(text), str(end))
+    return markup('md', text, end)
 def lf(text, end = '\n'):
-    return '\\textlf{%s}%s' % (str(text), str(end))
+    return markup('lf', text, end)
+def sout(text, end = '\n'):
+    return markup('sout', text, end)
 
 def chapter(text, end = '\n'):
-    return '\\chapter{%s}%s' % (str(text), str(end))
+    return markup('chapter', text, end)
 def section(text, end = '\n'):
-    return '\\section{%s}%s' % (str(text), str(end))
+    return markup('section', text, end)
 def subsection(text, end = '\n'):
-    return '\\subsection{%s}%s' % (str(text), str(end))
+    return markup('subsection', text, end)
 def subsubsection(text, end = '\n'):
-    return '\\subsubsection{%s}%s' % (str(text), str(end))
+    return markup('subsubsection', text, end)
 
 def chapterx(text, end = '\n'):
-    return '\\chapter*{%s}%s' % (str(text), str(end))
+    return markup('chapterx', text, end)
 def sectionx(text, end = '\n'):
-    return '\\section*{%s}%s' % (str(text), str(end))
+    return markup('sectionx', text, end)
 def subsectionx(text, end = '\n'):
-    return '\\subsection*{%s}%s' % (str(text), str(end))
+    return markup('subsectionx', text, end)
 def subsubsectionx(text, end = '\n'):
-    return '\\subsubsection*{%s}%s' % (str(text), str(end))
+    return markup('subsubsectionx', text, end)
+
+def item(text, end = '\n'):
+    return markup('item', text, end)
+
+
+def color(color, text, end = ''):
+    if backend == 'latex':
+        return '\\textcolor{%s}{%s}%s' % (color, str(text), str(end))
+    elif backend == 'html':
+        return '<span style="color:%s">%s</span>%s' % (html_color(color), str(text), str(end))
+    return str(text) + str(end)
+
+def colorbox(color, text, end = '', textcolor = None):
+    if backend == 'latex':
+        if textcolor is not None:
+            text = '\\textcolor{%s}{%s}' % (textcolor, str(text))
+        return '\\colorbox{%s}{%s}%s' % (color, str(text), str(end))
+    elif backend == 'html':
+        style = 'background-color:%s' % html_color(color)
+        if textcolor is not None:
+            style += ';color:%s' % html_color(textcolor)
+        return '<span style="%s;padding:0 0.2em">%s</span>%s' % (style, str(text), str(end))
+    return str(text) + str(end)
+
+
+def noindent():
+    return '\\noindent\n' if backend == 'latex' else ''
+
+def vspace(length):
+    if backend == 'latex':
+        return '\\vspace{%s}\n' % length
+    elif backend == 'html':
+        return '<div style="height:%s"></div>\n' % length
+    return '\n'
+
+def hspace(length):
+    return '\\hspace{%s}' % length if backend == 'latex' else ''
+def hspacex(length):
+    return '\\hspace*{%s}' % length if backend == 'latex' else ''
+
+
+def verbatim(text, end = ''):
+    if backend == 'latex':
+        return '\\begin{verbatim}%s\n\\end{verbatim}%s' % (text, str(end))
+    elif backend == 'html':
+        return '<pre>%s</pre>\n%s' % (escape(text.rstrip('\n')), str(end))
+    elif backend == 'markdown':
+        return '```\n%s\n```\n%s' % (text.rstrip('\n'), str(end))
+    return text.rstrip('\n') + '\n' + str(end)
+
+
+def includegraphics(filename, options = '', url = None, end = '\n'):
+    '''
+    Include an image
+    
+    With the HTML backend, the image is embedded in the
+    document, so that it does not depend on any other file.
+    With the Markdown and text backends, the image is linked.
+    
+    @param   filename:str  The image file
+    @param   options:str   Options for \\includegraphics, only used with LaTeX
+    @param   url:str?      Where the image can be found online, used instead of
+                           `filename` when the image is linked rather than included
+    @param   end:str       Text to append
+    @return  :str          The markup
+    '''
+    if backend == 'latex':
+        return '\\includegraphics%s{%s}%s' % ('' if options == '' else '[%s]' % options, filename, str(end))
+    elif backend == 'html':
+        import base64, mimetypes
+        try:
+            with open(filename, 'rb') as file:
+                data = base64.b64encode(file.read()).decode('ascii')
+            src = 'data:%s;base64,%s' % (mimetypes.guess_type(filename)[0] or 'image/png', data)
+        except OSError:
+            src = escape(filename if url is None else url).replace('"', '&quot;')
+        return '<div><img src="%s" alt="" style="max-width:100%%"></div>\n%s' % (src, str(end))
+    elif backend == 'markdown':
+        return '![](%s)\n%s' % (filename if url is None else url, str(end))
+    return (filename if url is None else url) + '\n' + str(end)
+
+
+def markup(name, text, end):
+    '''
+    Mark up text, using the format given for the current backend
+    in `MARKUP`, text is inserted as is if the backend has none
+    
+    @param   name:str  The name of the helper, e.g. 'bf'
+    @param   text:str  The text
+    @param   end:str   Text to append after the marked up text
+    @return  :str      The marked up text
+    '''
+    format = MARKUP[backend].get(name, '%s%s')
+    if callable(format):
+        return format(str(text), str(end))
+    return format % (str(text), str(end))
+
+
+def html_color(color):
+    '''
+    Convert an xcolor colour expression, such as 'red!75!black',
+    to a CSS colour
+    
+    @param   color:str  The colour expression
+    @return  :str       The CSS colour, `color` itself if it uses
+                        a colour that is not in `COLORS`
+    '''
+    parts = color.split('!')
+    if any(c not in COLORS for c in parts[0::2]):
+        return color
+    rgb = COLORS[parts[0]]
+    for i in range(1, len(parts), 2):
+        p = float(parts[i]) / 100
+        other = COLORS[parts[i + 1]] if i + 1 < len(parts) else COLORS['white']
+        rgb = tuple(p * a + (1 - p) * b for a, b in zip(rgb, other))
+    return '#%02x%02x%02x' % tuple(round(c * 255) for c in rgb)
+
+
+def markdown_table(spec):
+    '''
+    Get the header of a Markdown table, which is required,
+    from a LaTeX column specification
+    
+    @param   spec:str  The column specification
+    @return  :str      The header, with empty column titles
+    '''
+    import re
+    columns = len([c for c in re.sub(r'\{[^}]*\}', '', spec) if c in 'lcrpmbX'])
+    return '\n|%s\n|%s\n' % ('   |' * columns, '---|' * columns)
 
 
 def escape(text, end = ''):
-    r = ''
-    for c in str(text):
-        if c == '\\':
-            r += '\\verb|\\|'
-        elif c in '{}%_':
-            r += '\\' + c
-        else:
-            r += c
-    return r + str(end)
+    '''
+    Escape all characters that are special in the backend's markup
+    
+    @param   text:str  The text to escape
+    @param   end:str   Text to append to the escaped text, it is not escaped
+    @return  :str      The escaped text
+    '''
+    return str(text).translate(ESCAPES[backend]) + str(end)
+
+# The replacement for each special character, for each backend, see `escape`
+ESCAPES = { 'latex'    : str.maketrans({ '\\' : '\\textbackslash{}'
+                                       , '{'  : '\\{'
+                                       , '}'  : '\\}'
+                                       , '%'  : '\\%'
+                                       , '_'  : '\\_'
+                                       , '#'  : '\\#'
+                                       , '$'  : '\\$'
+                                       , '&'  : '\\&'
+                                       , '~'  : '\\textasciitilde{}'
+                                       , '^'  : '\\textasciicircum{}'
+                                       , '<'  : '\\textless{}'
+                                       , '>'  : '\\textgreater{}'
+                                       , '|'  : '\\textbar{}'
+                                       })
+          , 'html'     : str.maketrans({ '&' : '&amp;'
+                                       , '<' : '&lt;'
+                                       , '>' : '&gt;'
+                                       , '"' : '&quot;'
+                                       })
+          , 'markdown' : str.maketrans(dict((c, '\\' + c) for c in '\\`*_[]<>|#~'))
+          , 'text'     : {}
+          }
+
+# Font sizes, and their sizes in HTML
+SIZES = { 'Huge'         : '2.5em'
+        , 'huge'         : '2.1em'
+        , 'LARGE'        : '1.7em'
+        , 'Large'        : '1.45em'
+        , 'large'        : '1.2em'
+        , 'normalsize'   : '1em'
+        , 'small'        : '0.9em'
+        , 'footnotesize' : '0.8em'
+        , 'scriptsize'   : '0.7em'
+        , 'tiny'         : '0.5em'
+        }
+
+# The format, or function, each helper uses to mark up text, for each
+# backend, given the text and the text to append, see `markup`
+MARKUP = { 'latex'    : dict([(s, '{\\%s %%s}%%s' % s) for s in SIZES] +
+                             [('normal',         '\\textnormal{%s}%s'),
+                              ('emph',           '\\emph{%s}%s'),
+                              ('rm',             '\\textrm{%s}%s'),
+                              ('sf',             '\\textsf{%s}%s'),
+                              ('tt',             '\\texttt{%s}%s'),
+                              ('up',             '\\textup{%s}%s'),
+                              ('it',             '\\textit{%s}%s'),
+                              ('sl',             '\\textsl{%s}%s'),
+                              ('sc',             '\\textsc{%s}%s'),
+                              ('uppercase',      '\\uppercase{%s}%s'),
+                              ('bf',             '\\textbf{%s}%s'),
+                              ('md',             '\\textmd{%s}%s'),
+                              ('lf',             '\\textlf{%s}%s'),
+                              ('sout',           '\\sout{%s}%s'),
+                              ('chapter',        '\\chapter{%s}%s'),
+                              ('section',        '\\section{%s}%s'),
+                              ('subsection',     '\\subsection{%s}%s'),
+                              ('subsubsection',  '\\subsubsection{%s}%s'),
+                              ('chapterx',       '\\chapter*{%s}%s'),
+                              ('sectionx',       '\\section*{%s}%s'),
+                              ('subsectionx',    '\\subsection*{%s}%s'),
+                              ('subsubsectionx', '\\subsubsection*{%s}%s'),
+                              ('item',           '\\item %s%s')])
+         , 'html'     : dict([(s, '<span style="font-size:%s">%%s</span>%%s' % SIZES[s]) for s in SIZES] +
+                             [('normal',         '<span style="font-style:normal;font-weight:normal">%s</span>%s'),
+                              ('emph',           '<em>%s</em>%s'),
+                              ('rm',             '<span style="font-family:serif">%s</span>%s'),
+                              ('sf',             '<span style="font-family:sans-serif">%s</span>%s'),
+                              ('tt',             '<code>%s</code>%s'),
+                              ('up',             '<span style="font-style:normal">%s</span>%s'),
+                              ('it',             '<i>%s</i>%s'),
+                              ('sl',             '<span style="font-style:oblique">%s</span>%s'),
+                              ('sc',             '<span style="font-variant:small-caps">%s</span>%s'),
+                              ('uppercase',      '<span style="text-transform:uppercase">%s</span>%s'),
+                              ('bf',             '<b>%s</b>%s'),
+                              ('md',             '<span style="font-weight:normal">%s</span>%s'),
+                              ('sout',           '<s>%s</s>%s'),
+                              ('chapter',        '<h1>%s</h1>%s'),
+                              ('section',        '<h2>%s</h2>%s'),
+                              ('subsection',     '<h3>%s</h3>%s'),
+                              ('subsubsection',  '<h4>%s</h4>%s'),
+                              ('chapterx',       '<h1>%s</h1>%s'),
+                              ('sectionx',       '<h2>%s</h2>%s'),
+                              ('subsectionx',    '<h3>%s</h3>%s'),
+                              ('subsubsectionx', '<h4>%s</h4>%s'),
+                              ('item',           '<li>%s</li>%s')])
+         , 'markdown' : { 'Huge'           : '**%s**%s'
+                        , 'huge'           : '**%s**%s'
+                        , 'emph'           : '*%s*%s'
+                        , 'tt'             : '`%s`%s'
+                        , 'it'             : '*%s*%s'
+                        , 'sl'             : '*%s*%s'
+                        , 'uppercase'      : lambda text, end : text.upper() + end
+                        , 'bf'             : '**%s**%s'
+                        , 'sout'           : '~~%s~~%s'
+                        , 'chapter'        : '\n# %s\n%s'
+                        , 'section'        : '\n## %s\n%s'
+                        , 'subsection'     : '\n### %s\n%s'
+                        , 'subsubsection'  : '\n#### %s\n%s'
+                        , 'chapterx'       : '\n# %s\n%s'
+                        , 'sectionx'       : '\n## %s\n%s'
+                        , 'subsectionx'    : '\n### %s\n%s'
+                        , 'subsubsectionx' : '\n#### %s\n%s'
+                        , 'item'           : '- %s%s'
+                        }
+         , 'text'     : { 'uppercase'      : lambda text, end : text.upper() + end
+                        , 'chapter'        : lambda text, end : '\n%s\n%s\n%s' % (text, '=' * len(text), end)
+                        , 'section'        : lambda text, end : '\n%s\n%s\n%s' % (text, '=' * len(text), end)
+                        , 'subsection'     : lambda text, end : '\n%s\n%s\n%s' % (text, '-' * len(text), end)
+                        , 'subsubsection'  : lambda text, end : '\n%s\n%s\n%s' % (text, '-' * len(text), end)
+                        , 'chapterx'       : lambda text, end : '\n%s\n%s\n%s' % (text, '=' * len(text), end)
+                        , 'sectionx'       : lambda text, end : '\n%s\n%s\n%s' % (text, '=' * len(text), end)
+                        , 'subsectionx'    : lambda text, end : '\n%s\n%s\n%s' % (text, '-' * len(text), end)
+                        , 'subsubsectionx' : lambda text, end : '\n%s\n%s\n%s' % (text, '-' * len(text), end)
+                        , 'item'           : '  * %s%s'
+                        }
+         }
+
+# What `ln` appends, for each backend
+LINE_BREAKS = { 'latex'    : '\\\\\n'
+              , 'html'     : '<br>\n'
+              , 'markdown' : '  \n'
+              , 'text'     : '\n'
+              }
+
+# What `begin` and `end` return, for each backend other than LaTeX,
+# `None` is used for environments that are not listed. `begin`
+# calls the first element, with its arguments, if it is a function
+ENVIRONMENTS = { 'html'     : { 'document' : ('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+                                              '<title>Report of the day</title>\n</head>\n<body>\n',
+                                              '</body>\n</html>\n')
+                              , 'center'   : ('<div style="text-align:center">\n', '</div>\n')
+                              , 'tabular'  : (lambda *vargs : '<table>\n', '</table>\n')
+                              , 'itemize'  : ('<ul>\n', '</ul>\n')
+                              , 'enumerate': ('<ol>\n', '</ol>\n')
+                              , 'verbatim' : ('<pre>', '</pre>\n')
+                              , None       : ('<div>\n', '</div>\n')
+                              }
+               , 'markdown' : { 'tabular'  : (lambda spec = '', *vargs : markdown_table(spec), '\n')
+                              , 'itemize'  : ('\n', '\n')
+                              , 'verbatim' : ('```\n', '\n```\n')
+                              , None       : ('', '')
+                              }
+               , 'text'     : { 'itemize'  : ('\n', '\n')
+                              , None       : ('', '')
+                              }
+               }
+
+# RGB values of the colours `html_color` understands
+COLORS = { 'black'   : (0, 0, 0)
+         , 'white'   : (1, 1, 1)
+         , 'red'     : (1, 0, 0)
+         , 'green'   : (0, 1, 0)
+         , 'blue'    : (0, 0, 1)
+         , 'cyan'    : (0, 1, 1)
+         , 'magenta' : (1, 0, 1)
+         , 'yellow'  : (1, 1, 0)
+         , 'gray'    : (0.5, 0.5, 0.5)
+         , 'orange'  : (1, 0.5, 0)
+         , 'brown'   : (0.75, 0.5, 0.25)
+         , 'purple'  : (0.75, 0, 0.25)
+         }
+
+
+class Template:
+    '''
+    Markup with named fields, written as `<<name>>`
+    
+    The code is split into its literal parts and fields once,
+    so filling it in is a single join. Values are inserted
+    as they are, so text must be passed through `escape`
+    first. Fields named by numbers are filled in by
+    positional arguments.
+    '''
+    
+    def __init__(self, code):
+        '''
+        Constructor
+        
+        @param  code:str  The markup
+        '''
+        import re
+        parts = re.split(r'<<(\w+)>>', code)
+        self.literals = parts[0::2]
+        self.fields = parts[1::2]
+    
+    
+    def __call__(self, *args, **kwargs):
+        '''
+        Fill in the template
+        
+        @param   args:*str     The values of the fields named 0, 1, 2, ...
+        @param   kwargs:**str  The values of the other fields
+        @return  :str          The markup
+        '''
+        parts = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            parts.append(str(args[int(field)] if field.isdigit() else kwargs[field]))
+            parts.append(literal)
+        return ''.join(parts)
+    
+    
+    def rows(self, rows):
+        '''
+        Fill in the template once per row
+        
+        @param   rows:itr<tuple|dict>  The values for each row, positional or named
+        @return  :str                  The concatenated markup
+        '''
+        return ''.join(self(**row) if isinstance(row, dict) else self(*row) for row in rows)
+
+
+# Templates for each backend: 'titled_section' is a section with
+# a title, but without a number, 'event_row' is an event in a list
+# of upcoming events, and 'urgent_event_row' is one that is close
+TEMPLATES = dict((b, dict((name, Template(code)) for name, code in templates.items())) for b, templates in
+                 { 'latex'    : { 'titled_section'   : '\\section*{<<title>>}\n<<body>>'
+                                , 'event_row'        : 'In <<days>> <<unit>>: <<event>> (<<date>>)\\\\\n'
+                                , 'urgent_event_row' : '\\textcolor{red!75!black}{In <<days>> <<unit>>: <<event>> (<<date>>)}\\\\\n'
+                                }
+                 , 'html'     : { 'titled_section'   : '<h2><<title>></h2>\n<<body>>'
+                                , 'event_row'        : 'In <<days>> <<unit>>: <<event>> (<<date>>)<br>\n'
+                                , 'urgent_event_row' : '<span style="color:#bf0000">In <<days>> <<unit>>: <<event>> (<<date>>)</span><br>\n'
+                                }
+                 , 'markdown' : { 'titled_section'   : '\n## <<title>>\n\n<<body>>'
+                                , 'event_row'        : 'In <<days>> <<unit>>: <<event>> (<<date>>)  \n'
+                                , 'urgent_event_row' : '**In <<days>> <<unit>>: <<event>> (<<date>>)**  \n'
+                                }
+                 , 'text'     : { 'titled_section'   : '\n<<title>>\n<<rule>>\n\n<<body>>'
+                                , 'event_row'        : '  In <<days>> <<unit>>: <<event>> (<<date>>)\n'
+                                , 'urgent_event_row' : '! In <<days>> <<unit>>: <<event>> (<<date>>)\n'
+                                }
+                 }.items())
+
+def titled_section(title, body = ''):
+    '''
+    Create an unnumbered section
+    
+    @param   title:str  The title, in the backend's markup
+    @param   body:str   The content of the section, in the backend's markup
+    @return  :str       The markup
+    '''
+    return TEMPLATES[backend]['titled_section'](title = title, body = body, rule = '=' * len(title))
+
+def key_value_tabular(rows, spec = 'll'):
+    '''
+    Create a tabular with keys in bold face in the first column
+    
+    @param   rows:itr<(str, *str)>  The keys and their values, in the backend's markup
+    @param   spec:str               The column specification
+    @return  :str                   The markup
+    '''
+    rows = list(rows)
+    if backend == 'text':
+        width = max([len(r[0]) for r in rows] + [0])
+        rows = [(r[0].ljust(width),) + tuple(r[1:]) for r in rows]
+    return begin('tabular', spec) + ''.join(row(bf(r[0], ''), *r[1:]) for r in rows) + end('tabular')
+
+def event_list(events, urgent = 5):
+    '''
+    Create a list of upcoming events, one per line
+    
+    @param   events:itr<(str, int, struct_time)>  The events, as returned by
+                                                  `events.filter_events`, in
+                                                  the backend's markup
+    @param   urgent:int                           Events that are at most this number
+                                                  of days away are coloured red
+    @return  :str                                 The markup
+    '''
+    import time
+    templates = TEMPLATES[backend]
+    rc = []
+    for event, days, date in events:
+        template = templates['urgent_event_row'] if days <= urgent else templates['event_row']
+        rc.append(template(days = days, unit = 'day' if days == 1 else 'days', event = event,
+                           date = time.strftime('%Y-%m-%d', date)))
+    return ''.join(rc)
+
+class Section:
+    '''
+    A part of a `Document`, a list of LaTeX fragments
+    '''
+    
+    def __init__(self, *fragments):
+        '''
+        Constructor
+        
+        @param  fragments:*str  The initial fragments
+        '''
+        self.fragments = [str(f) for f in fragments]
+    
+    
+    def __iadd__(self, text):
+        '''
+        Append a fragment
+        
+        @param   text:str  The fragment
+        @return  :Section  `self`
+        '''
+        self.fragments.append(str(text))
+        return self
+    
+    
+    def __str__(self):
+        '''
+        Get the section's LaTeX code
+        
+        @return  :str  The concatenation of the fragments
+        '''
+        return ''.join(self.fragments)
+
+
+class Document:
+    '''
+    A LaTeX document, built from sections of fragments
+    
+    Fragments are added with `+=`, like to a `str`, to the
+    last section, and a new section is started with `section`.
+    Nothing is concatenated until the document is written,
+    with `write`, and then each fragment is written once.
+    
+    If the document is streamed, sections are written as soon
+    as the next section is started, so that the LaTeX file is
+    written while later sections are still being computed.
+    '''
+    
+    def __init__(self, *fragments, stream = False):
+        '''
+        Constructor
+        
+        @param  fragments:*str  The initial fragments, normally the preamble
+        @param  stream:bool     Should sections be written as soon as they are finished?
+        '''
+        self.sections = [Section(*fragments)]
+        self.stream = stream
+        self.written = 0
+    
+    
+    def __iadd__(self, text):
+        '''
+        Append a fragment to the last section
+        
+        @param   text:str   The fragment
+        @return  :Document  `self`
+        '''
+        self.sections[-1] += text
+        return self
+    
+    
+    def section(self, *fragments):
+        '''
+        Finish the last section and start a new one
+        
+        @param   fragments:*str  The initial fragments of the new section
+        @return  :Section        The new section
+        '''
+        self.sections.append(Section(*fragments))
+        if self.stream:
+            self.write(finished_only = True)
+        return self.sections[-1]
+    
+    
+    def write(self, finished_only = False):
+        '''
+        Write the sections that have not been written, to the LaTeX file
+        
+        @param  finished_only:bool  Should the last section be left unwritten?
+        '''
+        from __main__ import write
+        end = len(self.sections) - (1 if finished_only else 0)
+        if end > self.written:
+            write(f for s in self.sections[self.written : end] for f in s.fragments)
+            self.written = end
+    
+    
+    def __iter__(self):
+        '''
+        Get the fragments of the sections that have not been written,
+        the sections are marked as written, so that `write(doc)`
+        writes the rest of a streamed document
+        
+        @return  :itr<str>  The fragments
+        '''
+        sections, self.written = self.sections[self.written:], len(self.sections)
+        return (f for s in sections for f in s.fragments)
+    
+    
+    def __str__(self):
+        '''
+        Get the entire document's LaTeX code, including written sections
+        
+        @return  :str  The LaTeX code
+        '''
+        return ''.join(str(s) for s in self.sections)
+
+
+def validate(prologue, fragments, epilogue = '\\end{document}\n'):
+    '''
+    Check which of a number of LaTeX fragments can be compiled,
+    using as few pdflatex runs as possible
+    
+    All fragments are compiled together, each on its own page
+    and in its own group. If pdflatex fails, the error is mapped
+    back to the fragment it occurred in, that fragment is rejected,
+    and the fragments after it are compiled again. So if all
+    fragments are good, pdflatex is only run once.
+    
+    The verdicts are remembered, in $XDG_CACHE_HOME/rotd/pdf,
+    so pdflatex is not run at all if every fragment has been
+    checked, in the same document, before. Nothing is remembered
+    if pdflatex failed without pointing out a fragment.
+    
+    @param   prologue:str     The beginning of the document, up to and including
+                              `\\begin{document}`, that the fragments will be
+                              included in
+    @param   fragments:[str]  The fragments to test
+    @param   epilogue:str     The end of the document
+    @return  :list<bool>      Whether each fragment, in the same order as
+                              `fragments`, can be included in the document
+    '''
+    if backend != 'latex':
+        return [True] * len(fragments)
+    from __main__ import spawn, cachedir
+    import os, json, hashlib, threading
+    cache = '%s/validate.json' % cachedir('pdf')
+    try:
+        with open(cache, 'rb') as file:
+            known = json.loads(file.read().decode('utf-8', 'strict'))
+    except:
+        known = {}
+    keys = [hashlib.sha256(('%s\0%s\0%s' % (prologue, f, epilogue)).encode('utf-8')).hexdigest() for f in fragments]
+    rc = [known.get(key, False) for key in keys]
+    remaining = [i for i, key in enumerate(keys) if key not in known]
+    if len(remaining) == 0:
+        return rc
+    judged, aborted = [], False
+    while len(remaining) > 0:
+        doc = [prologue]
+        for i in remaining:
+            doc.append('\n\\clearpage\\typeout{rotd-fragment:%i}\\begingroup\n%s\n\\endgroup\n' % (i, fragments[i]))
+        doc.append('\n\\clearpage\\typeout{rotd-fragment:end}\n%s' % epilogue)
+        with open('rotd-validate.tex', 'wb') as file:
+            file.write(''.join(doc).encode('utf-8'))
+            file.flush()
+        try:
+            os.unlink('rotd-validate.log')
+        except FileNotFoundError:
+            pass
+        try:
+            spawn('pdflatex', '-halt-on-error', '-interaction=nonstopmode', '-draftmode',
+                  '--', 'rotd-validate.tex')
+            for i in remaining:
+                rc[i] = True
+            judged += remaining
+            break
+        except:
+            pass
+        try:
+            with open('rotd-validate.log', 'rb') as file:
+                log = file.read().decode('utf-8', 'replace').split('\n')
+        except FileNotFoundError:
+            # pdflatex could not be started
+            aborted = True
+            break
+        failed, error = None, False
+        for line in log:
+            if line.startswith('rotd-fragment:'):
+                failed = line.split(':')[1].strip()
+            elif line.startswith('!'):
+                error = True
+                break
+        if failed is None or not error:
+            # The prologue or epilogue is broken, or pdflatex was killed
+            aborted = True
+            break
+        failed = remaining[-1] if failed == 'end' else int(failed)
+        n = remaining.index(failed)
+        for i in remaining[:n]:
+            rc[i] = True
+        judged += remaining[:n + 1]
+        remaining = remaining[n + 1:]
+    if aborted:
+        # Fragments that were not judged are rejected, but only for this run
+        return rc
+    for i in judged:
+        known.pop(keys[i], None)
+        known[keys[i]] = rc[i]
+    for key in list(known)[:max(len(known) - VALIDATE_CACHE_ENTRIES, 0)]:
+        del known[key]
+    temp = '%s~%i.%i' % (cache, os.getpid(), threading.get_ident())
+    try:
+        with open(temp, 'wb') as file:
+            file.write(json.dumps(known).encode('utf-8'))
+            file.flush()
+        os.rename(temp, cache)
+    except OSError:
+        pass
+    return rc
+
+# The number of verdicts `validate` remembers, the oldest are forgotten first
+VALIDATE_CACHE_ENTRIES = 256
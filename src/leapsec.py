@@ -1,12 +1,14 @@
 # -*- python -*-
 # See LICENSE file for copyright and license details.
 
-def leap_seconds(abort_timer = 2):
+def leap_seconds(abort_timer = 2, ttl = 24 * 60 * 60):
     '''
     Return a list of all leapsecond announcements (possibly including
     retroactive announcements), the list can be filtered with `events.filter_events`
     
     @param   abort_timer:int               The number of seconds to wait before giving up
+    @param   ttl:int?                      The number of seconds a downloaded copy of the list
+                                           may be used before it is revalidated
     @return  :list<((u:, l: n:, k:), d:)>  List of announcements.
                                              u: UTC-time as (year, month, day, hour, minute)-tuple
                                              l: local time as (year, month, day, hour, minute)-tuple
@@ -15,118 +17,209 @@ def leap_seconds(abort_timer = 2):
                                                 describes the announcement slot
                                              d: the local time as a %Y-%m-%d formatted string
     '''
-    from __main__ import spawn
-    import time
+    table = leap_second_table(abort_timer = abort_timer, ttl = ttl)
+    return None if table is None else table.announcements()
+
+def leap_second_table(abort_timer = 2, ttl = 24 * 60 * 60):
+    '''
+    Get the table of leap seconds
+    
+    @param   abort_timer:int          The number of seconds to wait before giving up
+    @param   ttl:int?                 See `leap_seconds`
+    @return  :LeapSecondTable?        The table, `None` on failure
+    '''
+    from net import fetch
     try:
         #url = 'http://maia.usno.navy.mil/ser7/leapsec.dat'
         url = 'https://oceandata.sci.gsfc.nasa.gov/Ancillary/LUTs/modis/leapsec.dat'
-        annons = spawn('curl', url, abort_timer = abort_timer, get_stdout = True)
-        annons = annons.decode('utf-8', 'strict')
-        while not annons.startswith(' '):
-            annons = '\n'.join(annons.split('\n')[1:])
-        while '  ' in annons:
-            annons = annons.replace('  ', ' ')
-            annons = annons.replace('= ', '=').replace('=JD ', '=JD')
-        annons = [annon.lstrip().split(' ') for annon in annons.split('\n') if not annon == '']
-        test = lambda annon : annon.startswith('TAI-UTC=') or annon.startswith('UTC-TAI=')
-        annons = [annon[:3] + list(filter(test, annon)) for annon in annons]
-        MONTHS = { 'JAN' : 1
-                 , 'FEB' : 2
-                 , 'MAR' : 3
-                 , 'APR' : 4
-                 , 'MAY' : 5
-                 , 'JUN' : 6
-                 , 'JUL' : 7
-                 , 'AUG' : 8
-                 , 'SEP' : 9
-                 , 'OCT' : 10
-                 , 'NOV' : 11
-                 , 'DEC' : 12
-                 }
-        DAYS_OF_MONTHS = [-1, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-        def days(year, mon):
-            rc = DAYS_OF_MONTHS[mon]
-            if mon == 2:
-                if (year % 4 == 0 and not year % 100 == 0) or year % 400 == 0:
-                    rc += 1
-            return rc
-        def get_local_time(utctime, tz):
-            year, mon, mday, hour, minute = utctime
-            tzh, tzm = tz // 60 // 60, (tz // 60) % 60
-            hour, minute = hour + tzh, minute + tzm
-            if minute >= 60:
-                hour, minute = hour + 1, minute - 60
-            if minute < 0:
-                hour, minute = hour - 1, minute + 60
-            if hour >= 24:
-                mday, hour = mday + 1, hour - 24
-                if mday > days(year, mon):
-                    mon, mday = mon + 1, 1
-                    if mon == 13:
-                        year, mon = year + 1, 1
-            if hour < 0:
-                mday, hour = mday - 1, hour + 24
-                if mday == 0:
-                    mon -= 1
-                    if mon == 0:
-                        year, mon = year - 1, 12
-                    mday = days(year, mon)
-            return (year, mon, mday, hour, minute)
-        def timezone(date):
-            guessed = time.mktime(time.strptime(date, '%Y-%m-%d'))
-            for tzname, tzval in zip(time.tzname, (time.timezone, time.altzone)):
-                if time.mktime(time.strptime('%s %s' % (date, tzname), '%Y-%m-%d %Z')) == guessed:
-                    return -tzval
-            return -time.timezone
-        def translate(annon):
-            year = int(annon[0])
-            mon = MONTHS[annon[1]]
-            mday = int(annon[2]) - 1
-            amount = annon[3]
-            if amount.startswith('TAI-UTC='):
-                amount = int(amount.split('=')[1].split('.')[0])
-            else:
-                amount = -(int(amount.split('=')[1].split('.')[0]))
+        return LeapSecondTable.load(fetch(url, ttl = ttl, abort_timer = abort_timer))
+    except:
+        return None
+
+def parse_leap_seconds(annons):
+    '''
+    Parse a leapsec.dat file, see `leap_seconds`
+    
+    @param   annons:str                    The content of the file
+    @return  :list<((u:, l: n:, k:), d:)>  See `leap_seconds`
+    '''
+    return LeapSecondTable.parse(annons).announcements()
+
+class LeapSecondTable:
+    '''
+    The changes of TAI−UTC listed in a leapsec.dat file
+    
+    Each entry is the POSIX time at which it takes effect,
+    TAI−UTC at that time, and the modified Julian date and
+    the rate, in seconds per day, of the drift of TAI−UTC
+    that was used before 1972
+    '''
+    
+    def __init__(self, entries):
+        '''
+        Constructor
+        
+        @param  entries:itr<(int, float, float, float)>  The entries, in chronological order:
+                                                         (POSIX time, TAI−UTC, MJD, rate)
+        '''
+        self.entries = [tuple(entry) for entry in entries]
+        self.times = [entry[0] for entry in self.entries]
+    
+    
+    @staticmethod
+    def parse(text):
+        '''
+        Parse a leapsec.dat file
+        
+        @param   text:str          The content of the file
+        @return  :LeapSecondTable  The table
+        '''
+        import re
+        entries = []
+        for line in re.finditer(LEAP_SECOND_LINE, text, re.MULTILINE):
+            _, _, _, jd, sign, offset, mjd, rate = line.groups()
+            offset = float(offset) * (1 if sign == 'TAI-UTC' else -1)
+            t = round((float(jd) - 2440587.5) * 86400)
+            entries.append((t, offset, float(mjd or 0), float(rate or 0)))
+        entries.sort(key = lambda entry : entry[0])
+        return LeapSecondTable(entries)
+    
+    
+    @staticmethod
+    def load(data):
+        '''
+        Get the table for a leapsec.dat file, the table is parsed only
+        if the file is not the one the cached table was parsed from
+        
+        @param   data:bytes        The content of the file
+        @return  :LeapSecondTable  The table
+        '''
+        from __main__ import cachedir
+        import os, json, hashlib, threading
+        digest = hashlib.sha256(data).hexdigest()
+        cache = '%s/table.json' % cachedir('leapsec')
+        try:
+            with open(cache, 'rb') as file:
+                cached = json.loads(file.read().decode('utf-8', 'strict'))
+            if cached['sha256'] == digest:
+                return LeapSecondTable(cached['entries'])
+        except:
+            pass
+        table = LeapSecondTable.parse(data.decode('utf-8', 'strict'))
+        temp = '%s~%i.%i' % (cache, os.getpid(), threading.get_ident())
+        try:
+            with open(temp, 'wb') as file:
+                file.write(json.dumps({ 'sha256' : digest, 'entries' : table.entries }).encode('utf-8'))
+                file.flush()
+            os.rename(temp, cache)
+        except OSError:
+            pass
+        return table
+    
+    
+    def tai_utc_offset(self, t = None):
+        '''
+        Get the difference between TAI and UTC at a point in time
+        
+        @param   t:float?  The POSIX time, `None` for now
+        @return  :float?   TAI−UTC in seconds, `None` if `t` is before
+                           the first entry in the table
+        '''
+        import bisect, time
+        t = time.time() if t is None else t
+        i = bisect.bisect_right(self.times, t) - 1
+        if i < 0:
+            return None
+        _, offset, mjd, rate = self.entries[i]
+        return offset + (t / 86400 + 40587 - mjd) * rate
+    
+    
+    def next_leap_second(self, after = None):
+        '''
+        Get the first leap second after a point in time
+        
+        @param   after:float?    The POSIX time, `None` for now
+        @return  :(int, int)?    The POSIX time at which the new TAI−UTC takes
+                                 effect, the leap seconds are inserted (or removed)
+                                 immediately before it, and the number of leap
+                                 seconds; `None` if there is no such leap second
+                                 in the table
+        '''
+        import bisect, time
+        after = time.time() if after is None else after
+        for i in range(max(bisect.bisect_right(self.times, after), 1), len(self.entries)):
+            amount = self.amount(i)
+            if amount != 0:
+                return (self.entries[i][0], amount)
+        return None
+    
+    
+    def amount(self, i):
+        '''
+        Get the number of whole leap seconds an entry introduced
+        
+        @param   i:int  The index of the entry, must be positive
+        @return  :int   The number of leap seconds, negative if removed
+        '''
+        return int(self.entries[i][1]) - int(self.entries[i - 1][1])
+    
+    
+    def announcements(self):
+        '''
+        Get the leap seconds in the format `leap_seconds` returns
+        
+        @return  :list<((u:, l: n:, k:), d:)>  See `leap_seconds`
+        '''
+        import time
+        rc = []
+        for i in range(1, len(self.entries)):
+            amount = self.amount(i)
+            if amount == 0:
+                continue
+            utctime = time.gmtime(self.entries[i][0] - 60)
+            localtime = time.localtime(self.entries[i][0] - 60)
             kind = 'out-of-band'
-            if mday == 0:
-                mon -= 1
-                if mon == 0:
-                    mon = 12
-                    year -= 1
-                mday = days(year, mon)
-                if mon in (6, 12):
+            if time.gmtime(self.entries[i][0]).tm_mday == 1:
+                if utctime.tm_mon in (6, 12):
                     kind = 'primary'
-                elif mon in (3, 9):
+                elif utctime.tm_mon in (3, 9):
                     kind = 'secondary'
-            utctime = (year, mon, mday, 23, 59)
-            localtime = get_local_time(utctime, time.timezone)
-            tz = timezone('%i-%02i-%02i' % localtime[:3])
-            localtime = get_local_time(utctime, tz)
-            return [utctime, localtime, amount, kind]
-        annons = [translate(annon) for annon in annons]
-        for i in reversed(range(len(annons) - 1)):
-            annons[i + 1][2] -= annons[i][2]
-        annons = annons[1:]
-        rc = []
-        for annon in [annon for annon in annons if annon[2] != 0]:
-            rc.append((tuple(annon), '%i-%02i-%02i' % annon[1][:3]))
+            utctime, localtime = tuple(utctime[:5]), tuple(localtime[:5])
+            rc.append(((utctime, localtime, amount, kind), '%i-%02i-%02i' % localtime[:3]))
         return rc
-    except:
-        return None
+
+# A line in a leapsec.dat file: year, month, day, Julian date, direction, offset, MJD, rate
+LEAP_SECOND_LINE = (r'^\s*(\d+)\s+([A-Z]{3})\s+(\d+)\s*=JD\s*([0-9.]+)\s+(TAI-UTC|UTC-TAI)=\s*([0-9.]+)\s*S'
+                    r'(?:\s*\+\s*\(MJD\s*-\s*([0-9.]+)\)\s*X\s*([0-9.]+)\s*S)?')
+
+def leap_seconds_async(abort_timer = 2, ttl = 24 * 60 * 60):
+    '''
+    Start `leap_seconds` in the background
+    
+    @param   abort_timer:int                        The number of seconds to wait before giving up
+    @param   ttl:int?                               See `leap_seconds`
+    @return  :Future<list<((u:, l: n:, k:), d:)>?>  The future return value of `leap_seconds`
+    '''
+    from __main__ import defer
+    return defer(leap_seconds, abort_timer = abort_timer, ttl = ttl)
 
 def leap_seconds_to_strings(events, local = True, include_date = False, include_desc = False):
     '''
     Convert output from `leap_seconds` to human-friendly output
     that can still be passed to `events.filter_events`
     
-    You must have \\usepackage[normalem]{ulem} in our document
+    With the LaTeX backend, you must have \\usepackage[normalem]{ulem}
+    in our document
     
-    @parma   events:            Output from `leap_seconds`
+    @parma   events:            Output from `leap_seconds`, or a `LeapSecondTable`
     @param   local:bool         Print the leap seconds in local time rather than UTC
     @param   include_date:bool  Include the date of the leap second in each element
     @param   include_desc:bool  Include the text 'Leap seconds: ' at the beginning of each element
     @return  :list<(str, str)>  A more human-friendly version of `events`
     '''
+    if isinstance(events, LeapSecondTable):
+        events = events.announcements()
+    from latex import sout
     rc = []
     KIND = { 'primary'     : ''
            , 'secondary'   : '; secondary slot'
@@ -141,7 +234,7 @@ def leap_seconds_to_strings(events, local = True, include_date = False, include_
         if amount > 0:
             text = ['%s:%i' % (time, 60 + n) for n in range(amount)]
         else:
-            text = ['\\sout{%s:%i}' % (time, 59 - n) for n in reversed(range(-amount))]
+            text = [sout('%s:%i' % (time, 59 - n), '') for n in reversed(range(-amount))]
         if include_date:
             text = '%s%s %s (%s%s)' % (desc, date, ', '.join(text), zone, KIND[kind])
         else:
@@ -0,0 +1,280 @@
+# -*- python -*-
+# See LICENSE file for copyright and license details.
+
+def fetch(url, ttl = 0, abort_timer = 2, output = None):
+    '''
+    Download a file, using and updating the on-disk response cache
+    
+    Responses are stored in $XDG_CACHE_HOME/rotd/http. A cached response
+    that is younger than `ttl` seconds is used without making a request.
+    An older cached response is revalidated with its ETag and Last-Modified
+    date, so that the server can answer with 304 Not Modified instead
+    of sending the whole file again. If the request fails, a stale
+    cached response is used if there is one.
+    
+    Files are downloaded with `request`, over connections that are
+    kept open for later downloads from the same server. curl(1) is
+    used instead if a proxy is configured, or if the connection
+    fails, for other reasons than the time running out, and there
+    is time left; curl only gets the time that is left, so the
+    download never takes longer than `abort_timer` in total.
+    
+    If $ROTD_MIRROR is set, the file is downloaded from the
+    mirror instead, https://example.com/a/b is then fetched
+    from $ROTD_MIRROR/example.com/a/b, but cached as if it
+    was fetched from its original location.
+    
+    @param   url:str          The URL of the file
+    @param   ttl:int?         The number of seconds a cached response may be used
+                              without being revalidated, `None` if the response
+                              will never change
+    @param   abort_timer:int  The number of seconds to wait before giving up
+    @param   output:str?      The file to which to write the file, `None`
+                              if the file shall be returned instead
+    @return  :bytes|str       The content of the file, or `output` if not `None`
+    '''
+    from __main__ import cachedir
+    import os, time, json, shutil, hashlib, threading
+    cache = '%s/%s' % (cachedir('http'), hashlib.sha256(url.encode('utf-8')).hexdigest())
+    try:
+        with open(cache + '.json', 'rb') as file:
+            meta = json.loads(file.read().decode('utf-8', 'strict'))
+        if not os.path.exists(cache) or meta['url'] != url:
+            meta = None
+    except:
+        meta = None
+    now = time.time()
+    deadline = time.monotonic() + abort_timer if abort_timer > 0 else None
+    if meta is None or not (ttl is None or now - meta['time'] < ttl):
+        mirror = os.environ.get('ROTD_MIRROR', '')
+        remote = url if mirror == '' else '%s/%s' % (mirror.rstrip('/'), url.split('://', 1)[-1])
+        temp = '%s~%i.%i' % (cache, os.getpid(), threading.get_ident())
+        headers = {}
+        if meta is not None and meta['etag'] is not None:
+            headers['If-None-Match'] = meta['etag']
+        if meta is not None and meta['last_modified'] is not None:
+            headers['If-Modified-Since'] = meta['last_modified']
+        try:
+            if any(os.environ.get(var, '') != '' for var in PROXY_VARIABLES):
+                # Proxies are only supported by curl
+                status, headers = request_curl(remote, headers, abort_timer = abort_timer, output = temp)
+            else:
+                try:
+                    status, headers = request(remote, headers, abort_timer = abort_timer, output = temp)
+                except TimeoutError:
+                    raise
+                except OSError:
+                    # The connection failed, try curl with the time that is left
+                    left = None if deadline is None else deadline - time.monotonic()
+                    if left is not None and left <= 0:
+                        raise TimeoutError('Timed out while downloading %s' % url)
+                    status, headers = request_curl(remote, headers, abort_timer = left or 0, output = temp)
+            if status == 304 and meta is not None:
+                meta['time'] = now
+            elif 200 <= status < 300:
+                meta = { 'url'           : url
+                       , 'time'          : now
+                       , 'etag'          : headers.get('etag', None)
+                       , 'last_modified' : headers.get('last-modified', None)
+                       }
+                os.rename(temp, cache)
+            else:
+                raise Exception('HTTP request failed with status %i' % status)
+            with open(temp + '.json', 'wb') as file:
+                file.write(json.dumps(meta).encode('utf-8'))
+                file.flush()
+            os.rename(temp + '.json', cache + '.json')
+        except Exception as err:
+            if meta is None:
+                raise err
+        finally:
+            for f in (temp, temp + '.headers'):
+                try:
+                    os.unlink(f)
+                except FileNotFoundError:
+                    pass
+    if output is None:
+        with open(cache, 'rb') as file:
+            return file.read()
+    shutil.copyfile(cache, output)
+    return output
+
+
+def request(url, headers = {}, abort_timer = 2, output = None):
+    '''
+    Make a GET request, and follow redirections
+    
+    Connections are taken from, and returned to, `connections`, so
+    that later requests to the same server, from any plugin, need
+    not open a new connection. gzip-compressed responses are
+    decompressed as they are read.
+    
+    @param   url:str                 The URL of the file, http or https
+    @param   headers:dict<str, str>  Additional request headers
+    @param   abort_timer:int         The number of seconds to wait before giving
+                                     up, 0 for never, TimeoutError is raised if
+                                     the request has not completed by then
+    @param   output:str?             The file to which to write the body of the
+                                     response, `None` to discard it
+    @return  :(int, dict<str, str>)  The status of the response, and its headers
+                                     with lower-case names
+    '''
+    import time, zlib, http.client, urllib.parse
+    deadline = time.monotonic() + abort_timer if abort_timer > 0 else None
+    def remaining():
+        if deadline is None:
+            return None
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise TimeoutError('Timed out while downloading %s' % url)
+        return left
+    for _ in range(HTTP_MAX_REDIRECTIONS + 1):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise Exception('Unsupported URL scheme: %s' % parts.scheme)
+        server = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        request_headers = { 'Host'            : parts.netloc.split('@')[-1]
+                          , 'Accept-Encoding' : 'gzip'
+                          , 'User-Agent'      : 'rotd'
+                          }
+        request_headers.update(headers)
+        for attempt in range(2):
+            connection, reused = connect(server, remaining())
+            try:
+                connection.request('GET', path, headers = request_headers)
+                sock = connection.sock
+                response = connection.getresponse()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server may have closed the idle connection, try once more with a new one
+                connection.close()
+                if not reused or attempt == 1:
+                    raise
+            except BaseException:
+                connection.close()
+                raise
+        try:
+            status = response.status
+            response_headers = dict((k.lower(), v) for k, v in response.getheaders())
+            location = response_headers.get('location', None)
+            redirect = status in (301, 302, 303, 307, 308) and location is not None
+            save = output is not None and 200 <= status < 300 and not redirect
+            gzipped = response_headers.get('content-encoding', '').lower() in ('gzip', 'x-gzip')
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+            with open(output if save else '/dev/null', 'wb') as file:
+                while True:
+                    sock.settimeout(remaining())
+                    chunk = response.read1(64 << 10)
+                    if len(chunk) == 0:
+                        break
+                    if save:
+                        file.write(chunk if decompressor is None else decompressor.decompress(chunk))
+                if save and decompressor is not None:
+                    file.write(decompressor.flush())
+                file.flush()
+        except BaseException:
+            connection.close()
+            raise
+        release(server, connection, response)
+        if not redirect:
+            return (status, response_headers)
+        url = urllib.parse.urljoin(url, location)
+    raise Exception('Too many redirections')
+
+
+def request_curl(url, headers = {}, abort_timer = 2, output = None):
+    '''
+    Make a GET request, and follow redirections, using curl(1)
+    
+    @param   url:str                 The URL of the file
+    @param   headers:dict<str, str>  Additional request headers
+    @param   abort_timer:int|float   The number of seconds to wait before giving up, 0 for never
+    @param   output:str              The file to which to write the body of the response
+    @return  :(int, dict<str, str>)  The status of the response, and the headers of
+                                     the last response with lower-case names
+    '''
+    from __main__ import spawn
+    cmd = ['curl', '--silent', '--show-error', '--location', '--compressed',
+           '--dump-header', output + '.headers', '--output', output,
+           '--write-out', '%{http_code}']
+    for header in headers.items():
+        cmd += ['--header', '%s: %s' % header]
+    status = spawn(*cmd, '--', url, abort_timer = abort_timer, get_stdout = True)
+    status = int(status.decode('utf-8', 'strict').strip())
+    with open(output + '.headers', 'rb') as file:
+        headers = file.read().decode('latin-1').replace('\r', '').split('\n')
+    # Only keep the headers of the last response if we were redirected
+    while len(headers) > 0 and headers[-1] == '':
+        headers = headers[:-1]
+    if '' in headers:
+        headers = headers[len(headers) - headers[::-1].index(''):]
+    headers = [h.split(':', 1) for h in headers if ':' in h]
+    return (status, dict((k.strip().lower(), v.strip()) for k, v in headers))
+
+
+def connect(server, timeout):
+    '''
+    Get a connection to a server, an idle connection is reused if there is one
+    
+    @param   server:(scheme:str, host:str, port:int?)  The server
+    @param   timeout:float?                            The timeout for connecting
+    @return  :(http.client.HTTPConnection, bool)       The connection, and whether
+                                                       it has been used before
+    '''
+    global connections_pid
+    import os, http.client
+    if connections_pid != os.getpid():
+        # We have been forked, the connections belong to the parent
+        connections.clear()
+        connections_pid = os.getpid()
+    try:
+        connection = connections.get(server, []).pop()
+        connection.sock.settimeout(timeout)
+        return (connection, True)
+    except IndexError:
+        pass
+    scheme, host, port = server
+    if scheme == 'https':
+        import ssl
+        connection = http.client.HTTPSConnection(host, port, timeout = timeout,
+                                                 context = ssl.create_default_context())
+    else:
+        connection = http.client.HTTPConnection(host, port, timeout = timeout)
+    connection.connect()
+    return (connection, False)
+
+
+def release(server, connection, response):
+    '''
+    Return a connection to `connections`, after its response has
+    been read, or close it if it cannot be reused
+    
+    @param  server:(scheme:str, host:str, port:int?)  The server
+    @param  connection:http.client.HTTPConnection     The connection
+    @param  response:http.client.HTTPResponse         The response that was read
+    '''
+    response.close()
+    idle = connections.setdefault(server, [])
+    if response.will_close or connection.sock is None or len(idle) >= HTTP_MAX_IDLE_CONNECTIONS:
+        connection.close()
+    else:
+        idle.append(connection)
+
+
+# Idle connections, by (scheme, host, port)
+connections = {}
+
+# The process `connections` belongs to
+connections_pid = None
+
+# The maximum number of idle connections to keep per server
+HTTP_MAX_IDLE_CONNECTIONS = 4
+
+# The maximum number of redirections to follow
+HTTP_MAX_REDIRECTIONS = 10
+
+# Environment variables that configure proxies, curl is used if any is set
+PROXY_VARIABLES = ('http_proxy', 'https_proxy', 'HTTPS_PROXY', 'all_proxy', 'ALL_PROXY')
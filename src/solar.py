@@ -3,13 +3,31 @@
 
 # Requires https://github.com/maandree/solar-python
 
+# Calculated times, in Julian centuries, by (lat, lon, local date, threshold)
+solar_cache = {}
+
+# The file `solar_cache` is saved to, `None` if it has not been loaded from disk
+solar_cache_file = None
+
+# The number of past days, and the number of entries, kept when `solar_cache` is saved
+SOLAR_CACHE_DAYS = 7
+SOLAR_CACHE_ENTRIES = 4096
+
 class Solar:
-    def __init__(self, lat = None, lon = None):
+    def __init__(self, lat = None, lon = None, mode = 'string', persistent = False):
         '''
         Constructor
         
-        @param  lat:float?  The GPS latitude of your location
-        @param  lon:float?  The GPS longitude of your location
+        @param  lat:float?       The GPS latitude of your location
+        @param  lon:float?       The GPS longitude of your location
+        @param  mode:str         How points in time shall be returned: 'string'
+                                 for '%Y-%m-%d %H:%M:%S' formatted strings,
+                                 'epoch' for POSIX times as floats, or 'jc'
+                                 for Julian centuries as floats
+        @param  persistent:bool  Whether calculated times shall be cached on disk,
+                                 in $XDG_CACHE_HOME/rotd/solar, so that later runs
+                                 do not have to calculate them again. (They are
+                                 always cached in memory.)
         
         If `lon` most be specified iff `lat` is specified. If `lat`
         and `lon` are not specified, `~/.config/geolocation` and
@@ -18,6 +36,11 @@ class Solar:
         Be aware, and exception is raised if no location has
         been set.
         '''
+        if mode not in ('string', 'epoch', 'jc'):
+            raise Exception('Invalid mode: %s' % mode)
+        self.mode = mode
+        if persistent:
+            Solar.__load_cache()
         if lat is not None:
             self.lat = lat
             self.lon = lon
@@ -53,10 +76,99 @@ class Solar:
         return time.strftime('%Y-%m-%d %H:%M:%S', t)
     
     
+    def __present(self, t):
+        '''
+        Convert a point in time to the selected mode
+        
+        @param   t:float?            The point in time, in Julian centuries
+        @return  :str?|float?        The point in time, as selected by `self.mode`
+        '''
+        import solar_python
+        if t is None or self.mode == 'jc':
+            return t
+        if self.mode == 'epoch':
+            return solar_python.julian_centuries_to_epoch(t)
+        return Solar.__jc_to_str(t)
+    
+    
+    def __seconds(self, s):
+        '''
+        Convert a point in time, in the selected mode, to a POSIX time
+        
+        @param   s:str|float  The point in time, as returned by `__present`
+        @return  :int         The point in time, as a POSIX time, truncated
+        '''
+        import time, solar_python
+        if isinstance(s, str):
+            return int(time.strftime('%s', time.strptime(s, '%Y-%m-%d %H:%M:%S')))
+        if self.mode == 'jc':
+            s = solar_python.julian_centuries_to_epoch(s)
+        return int(s)
+    
+    
     @staticmethod
-    def __seconds(s):
+    def __load_cache():
+        '''
+        Load `solar_cache` from disk, and have it saved when rotd exits
+        '''
+        global solar_cache_file
+        from __main__ import cachedir
+        import json, atexit
+        if solar_cache_file is not None:
+            return
+        solar_cache_file = '%s/times.json' % cachedir('solar')
+        try:
+            with open(solar_cache_file, 'rb') as file:
+                cache = json.loads(file.read().decode('utf-8', 'strict'))
+            for key, value in cache:
+                key = tuple(tuple(x) if isinstance(x, list) else x for x in key)
+                solar_cache.setdefault(key, tuple(value) if isinstance(value, list) else value)
+        except:
+            pass
+        atexit.register(Solar.__save_cache)
+    
+    
+    @staticmethod
+    def __save_cache():
+        '''
+        Save `solar_cache` to disk
+        
+        Days more than `SOLAR_CACHE_DAYS` days in the past are left
+        out, and then the earliest days if more than `SOLAR_CACHE_ENTRIES`
+        entries remain, so that the file does not grow without limit
+        '''
+        import os, json, time, threading
+        first = time.strftime('%Y-%m-%d', time.localtime(time.time() - SOLAR_CACHE_DAYS * 24 * 60 * 60))
+        entries = sorted((item for item in solar_cache.items() if item[0][2][:10] >= first), key = lambda item : item[0][2])
+        entries = entries[max(len(entries) - SOLAR_CACHE_ENTRIES, 0):]
+        temp = '%s~%i.%i' % (solar_cache_file, os.getpid(), threading.get_ident())
+        try:
+            with open(temp, 'wb') as file:
+                file.write(json.dumps(entries).encode('utf-8'))
+                file.flush()
+            os.rename(temp, solar_cache_file)
+        except:
+            try:
+                os.unlink(temp)
+            except:
+                pass
+    
+    
+    def __memo(self, t, threshold, function):
+        '''
+        Look up a calculated value in `solar_cache`, and calculate it if missing
+        
+        @param   t:float              The beginning of the local day, as a POSIX time
+        @param   threshold:           Identifies what is calculated for the day
+        @param   function:()->float?  Function that calculates the value
+        @return  :float?              The return value of `function`
+        '''
         import time
-        return int(time.strftime('%s', time.strptime(s, '%Y-%m-%d %H:%M:%S')))
+        date = time.strftime('%Y-%m-%d%z', time.localtime(t))
+        key = (self.lat, self.lon, date, threshold)
+        if key not in solar_cache:
+            solar_cache[key] = function()
+        return solar_cache[key]
     
     def season(self):
         '''
@@ -91,10 +203,10 @@ class Solar:
         calculated using interpolation, I don't know how aa.usno.navy.mil does
         it, but probably with a formula.
         
-        @return  :str  The time of the next equinox formatted as '%Y-%m-%d %H:%M:%S'
+        @return  :str|float  The time of the next equinox, in the format selected by `mode`
         '''
         import solar_python
-        return Solar.__jc_to_str(solar_python.future_equinox())
+        return self.__present(solar_python.future_equinox())
     
     
     def next_solstice(self):
@@ -106,10 +218,10 @@ class Solar:
         calculated using interpolation, I don't know how aa.usno.navy.mil does
         it, but probably with a formula.
         
-        @return  :str  The time of the next solstice formatted as '%Y-%m-%d %H:%M:%S'
+        @return  :str|float  The time of the next solstice, in the format selected by `mode`
         '''
         import solar_python
-        return Solar.__jc_to_str(solar_python.future_solstice())
+        return self.__present(solar_python.future_solstice())
     
     
     def previous_equinox(self):
@@ -121,10 +233,10 @@ class Solar:
         calculated using interpolation, I don't know how aa.usno.navy.mil does
         it, but probably with a formula.
         
-        @return  :str  The time of the previous equinox formatted as '%Y-%m-%d %H:%M:%S'
+        @return  :str|float  The time of the previous equinox, in the format selected by `mode`
         '''
         import solar_python
-        return Solar.__jc_to_str(solar_python.past_equinox())
+        return self.__present(solar_python.past_equinox())
     
     
     def previous_solstice(self):
@@ -136,10 +248,10 @@ class Solar:
         calculated using interpolation, I don't know how aa.usno.navy.mil does
         it, but probably with a formula.
         
-        @return  :str  The time of the previous solstice formatted as '%Y-%m-%d %H:%M:%S'
+        @return  :str|float  The time of the previous solstice, in the format selected by `mode`
         '''
         import solar_python
-        return Solar.__jc_to_str(solar_python.past_solstice())
+        return self.__present(solar_python.past_solstice())
     
     
     def elevations(self, days_offset = 0):
@@ -155,7 +267,8 @@ class Solar:
                                                        dusk. (Those are in chronological order.) If such
                                                        condition is not meet during the day, `None` is
                                                        returned in place. Solar noon is guaranteed (I think.)
-                                                       Times are formatted in '%Y-%m-%d %H:%M:%S'.
+                                                       Times are formatted in '%Y-%m-%d %H:%M:%S', or
+                                                       are floats, as selected by `mode`.
         '''
         import solar_python as s, time
         tz = -(time.timezone, time.altzone)[time.localtime().tm_isdst]
@@ -167,22 +280,159 @@ class Solar:
         t += days_offset * a_day
         start = s.epoch_to_julian_centuries(t)
         end = s.epoch_to_julian_centuries(t + a_day)
-        t5a = s.future_elevation_derivative(self.lat, self.lon, 0, start)
-        t5b = s.future_elevation_derivative(self.lat, self.lon, 0, t5a + 0.0000002)
-        e1 = s.solar_elevation(self.lat, self.lon, t5a)
-        e2 = s.solar_elevation(self.lat, self.lon, t5b)
-        t5 = t5a if e1 > e2 else t5b
-        t1 = s.past_elevation(self.lat, self.lon, s.SOLAR_ELEVATION_ASTRONOMICAL_DUSK_DAWN, t5)
-        t2 = s.past_elevation(self.lat, self.lon, s.SOLAR_ELEVATION_NAUTICAL_DUSK_DAWN, t5)
-        t3 = s.past_elevation(self.lat, self.lon, s.SOLAR_ELEVATION_CIVIL_DUSK_DAWN, t5)
-        t4 = s.past_elevation(self.lat, self.lon, s.SOLAR_ELEVATION_SUNSET_SUNRISE, t5)
-        t6 = s.future_elevation(self.lat, self.lon, s.SOLAR_ELEVATION_SUNSET_SUNRISE, t5)
-        t7 = s.future_elevation(self.lat, self.lon, s.SOLAR_ELEVATION_CIVIL_DUSK_DAWN, t5)
-        t8 = s.future_elevation(self.lat, self.lon, s.SOLAR_ELEVATION_NAUTICAL_DUSK_DAWN, t5)
-        t9 = s.future_elevation(self.lat, self.lon, s.SOLAR_ELEVATION_ASTRONOMICAL_DUSK_DAWN, t5)
+        def noon():
+            t5a = s.future_elevation_derivative(self.lat, self.lon, 0, start)
+            t5b = s.future_elevation_derivative(self.lat, self.lon, 0, t5a + 0.0000002)
+            e1 = s.solar_elevation(self.lat, self.lon, t5a)
+            e2 = s.solar_elevation(self.lat, self.lon, t5b)
+            return t5a if e1 > e2 else t5b
+        t5 = self.__memo(t, 'noon', noon)
+        def dawn_dusk(elevation):
+            return self.__memo(t, elevation, lambda : (s.past_elevation(self.lat, self.lon, elevation, t5),
+                                                       s.future_elevation(self.lat, self.lon, elevation, t5)))
+        t4, t6 = dawn_dusk(s.SOLAR_ELEVATION_SUNSET_SUNRISE)
+        t3, t7 = dawn_dusk(s.SOLAR_ELEVATION_CIVIL_DUSK_DAWN)
+        t2, t8 = dawn_dusk(s.SOLAR_ELEVATION_NAUTICAL_DUSK_DAWN)
+        t1, t9 = dawn_dusk(s.SOLAR_ELEVATION_ASTRONOMICAL_DUSK_DAWN)
         t = (t1, t2, t3, t4, t5, t6, t7, t8, t9)
-        #return tuple(Solar.__jc_to_str(x) if x is not None and start <= x <= end else None for x in t)
-        return tuple(Solar.__jc_to_str(x) for x in t)
+        #return tuple(self.__present(x) if x is not None and start <= x <= end else None for x in t)
+        return tuple(self.__present(x) for x in t)
+    
+    
+    def __epoch_present(self, t):
+        '''
+        Convert a POSIX time to the selected mode
+        
+        @param   t:float        The point in time, as a POSIX time
+        @return  :str|float     The point in time, as selected by `self.mode`
+        '''
+        import time
+        if self.mode == 'epoch':
+            return t
+        if self.mode == 'jc':
+            return (t / 86400 + 2440587.5 - 2451545) / 36525
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t))
+    
+    
+    @staticmethod
+    def __elevation_grid(lat, lon, t):
+        '''
+        Calculate the Sun's elevation, using NumPy, at many points in time
+        
+        This uses the same formulae (NOAA's) as solar-python
+        
+        @param   lat:float           The GPS latitude
+        @param   lon:float           The GPS longitude
+        @param   t:numpy.ndarray     POSIX times
+        @return  :numpy.ndarray      The Sun's elevation, in degrees, at each time
+        '''
+        import numpy as np
+        jc = (t / 86400 + 2440587.5 - 2451545) / 36525
+        l0 = np.radians((280.46646 + jc * (36000.76983 + jc * 0.0003032)) % 360)
+        m = np.radians(357.52911 + jc * (35999.05029 - 0.0001537 * jc))
+        e = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+        c = np.sin(m) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+        c += np.sin(2 * m) * (0.019993 - 0.000101 * jc) + np.sin(3 * m) * 0.000289
+        omega = np.radians(125.04 - 1934.136 * jc)
+        lam = l0 + np.radians(c - 0.00569 - 0.00478 * np.sin(omega))
+        eps = 23 + (26 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60) / 60
+        eps = np.radians(eps + 0.00256 * np.cos(omega))
+        dec = np.arcsin(np.sin(eps) * np.sin(lam))
+        y = np.tan(eps / 2) ** 2
+        eqtime = y * np.sin(2 * l0) - 2 * e * np.sin(m) + 4 * e * y * np.sin(m) * np.cos(2 * l0)
+        eqtime -= 0.5 * y * y * np.sin(4 * l0) + 1.25 * e * e * np.sin(2 * m)
+        ha = np.radians((t % 86400) / 240 + np.degrees(eqtime) + lon - 180)
+        lat = np.radians(lat)
+        cosz = np.sin(lat) * np.sin(dec) + np.cos(lat) * np.cos(dec) * np.cos(ha)
+        return 90 - np.degrees(np.arccos(np.clip(cosz, -1, 1)))
+    
+    
+    def elevations_range(self, start_offset = 0, days = 1):
+        '''
+        Calculate `self.elevations` for a number of consecutive days at once
+        
+        Rather than searching for each time separately, the Sun's elevation
+        is calculated for every five minutes over the entire range, using
+        NumPy, all crossings of the elevations are located in this table,
+        and then refined together.
+        
+        Dawns and dusks that are more than 24 hours from the solar
+        noon of the day are reported as `None`.
+        
+        @param   start_offset:int                           The number of days into the future, for
+                                                            the first day, 0 for today
+        @param   days:int                                   The number of days
+        @return  :list<(:str?, :str?, :str?, :str?, :str,   The value `self.elevations` returns,
+                        :str?, :str?, :str?, :str?)>        for each day, in order
+        '''
+        import numpy as np, solar_python as s, time
+        tz = -(time.timezone, time.altzone)[time.localtime().tm_isdst]
+        a_day = 60 * 60 * 24
+        t = time.time()
+        t += tz
+        t -= t % a_day
+        t -= tz
+        starts = t + (start_offset + np.arange(days)) * a_day
+        step = 5 * 60
+        grid = np.arange(t + (start_offset - 1) * a_day, t + (start_offset + days + 1) * a_day + step, step)
+        elev = Solar.__elevation_grid(self.lat, self.lon, grid)
+        
+        # Solar noon: the first local maximum, on or after the beginning of the day
+        peaks = np.nonzero((elev[1:-1] > elev[:-2]) & (elev[1:-1] >= elev[2:]))[0] + 1
+        lo, hi = grid[peaks - 1], grid[peaks + 1]
+        for _ in range(40):
+            a, b = lo + (hi - lo) / 3, hi - (hi - lo) / 3
+            higher = Solar.__elevation_grid(self.lat, self.lon, a) > Solar.__elevation_grid(self.lat, self.lon, b)
+            hi, lo = np.where(higher, b, hi), np.where(higher, lo, a)
+        peaks = (lo + hi) / 2
+        noons = peaks[np.searchsorted(peaks, starts)]
+        
+        def crossings(threshold):
+            above = elev > threshold
+            i = np.nonzero(above[1:] != above[:-1])[0]
+            rising = above[i + 1]
+            lo, hi = grid[i], grid[i + 1]
+            for _ in range(24):
+                mid = (lo + hi) / 2
+                up = (Solar.__elevation_grid(self.lat, self.lon, mid) > threshold) == rising
+                hi, lo = np.where(up, mid, hi), np.where(up, lo, mid)
+            return (lo + hi) / 2, rising
+        
+        columns = []
+        for threshold in (s.SOLAR_ELEVATION_ASTRONOMICAL_DUSK_DAWN, s.SOLAR_ELEVATION_NAUTICAL_DUSK_DAWN,
+                          s.SOLAR_ELEVATION_CIVIL_DUSK_DAWN, s.SOLAR_ELEVATION_SUNSET_SUNRISE):
+            times, rising = crossings(threshold)
+            dawns, dusks = times[rising], times[~rising]
+            # The last dawn before, and the first dusk after, the solar noon
+            dawn = np.searchsorted(dawns, noons) - 1
+            dusk = np.searchsorted(dusks, noons)
+            dawn = [None if i < 0 or noon - dawns[i] > a_day else dawns[i] for i, noon in zip(dawn, noons)]
+            dusk = [None if i >= len(dusks) or dusks[i] - noon > a_day else dusks[i] for i, noon in zip(dusk, noons)]
+            columns.append((dawn, dusk))
+        
+        rc = []
+        for day in range(days):
+            row = [columns[i][0][day] for i in range(4)] + [noons[day]]
+            row += [columns[i][1][day] for i in reversed(range(4))]
+            rc.append(tuple(None if x is None else self.__epoch_present(float(x)) for x in row))
+        return rc
+    
+    
+    def lengths_range(self, start_offset = 0, days = 1, format = '%ih %i\' %i\'\'', solar_noon_string = ''):
+        '''
+        Calculate `self.lengths` for a number of consecutive days at once
+        
+        @param   start_offset:int                The number of days into the future, for
+                                                 the first day, 0 for today
+        @param   days:int                        The number of days
+        @param   format:str?                     See `self.lengths`
+        @param   solar_noon_string:str?          See `self.lengths`
+        @return  :list<(str{9|8})|(int{9|8})>    The value `self.lengths` returns,
+                                                 for each day, in order
+        '''
+        elevs = self.elevations_range(start_offset, days + 1)
+        return [self.lengths(today, tomorrow, format = format, solar_noon_string = solar_noon_string)
+                for today, tomorrow in zip(elevs[:-1], elevs[1:])]
     
     
     def lengths(self, today, tomorrow, format = '%ih %i\' %i\'\'', solar_noon_string = ''):
@@ -217,8 +467,8 @@ class Solar:
                                                     8: The duration between nautical dusk and
                                                        nautical dawn
         '''
-        today    = [None if x is None else Solar.__seconds(x) for x in today]
-        tomorrow = [None if x is None else Solar.__seconds(x) for x in tomorrow]
+        today    = [None if x is None else self.__seconds(x) for x in today]
+        tomorrow = [None if x is None else self.__seconds(x) for x in tomorrow]
         one_day  = 24 * 60 * 60
         for L in (today, tomorrow):
             for i in range(5, 9):
@@ -268,6 +518,7 @@ class Solar:
                                  3: The beginning of the evening X hour
                                  4: The end of the evening X hour
                                  5: The duration of the evening X hour
+                                 Times are formatted as selected by `mode`
         '''
         # TODO support not adjusting the timezone
         import solar_python as s, time
@@ -280,10 +531,11 @@ class Solar:
         t += days_offset * a_day
         start = s.epoch_to_julian_centuries(t)
         end = s.epoch_to_julian_centuries(t + a_day)
-        t1 = s.future_elevation(self.lat, self.lon, elevations[0], start)
-        t2 = s.future_elevation(self.lat, self.lon, elevations[1], start)
-        t3 = s.past_elevation(self.lat, self.lon, elevations[1], end)
-        t4 = s.past_elevation(self.lat, self.lon, elevations[0], end)
+        def within_day(elevation):
+            return self.__memo(t, ('day', elevation), lambda : (s.future_elevation(self.lat, self.lon, elevation, start),
+                                                                s.past_elevation(self.lat, self.lon, elevation, end)))
+        t1, t4 = within_day(elevations[0])
+        t2, t3 = within_day(elevations[1])
         (t1, t2, t3, t4) = tuple(x if x is not None and start <= x <= end else None for x in (t1, t2, t3, t4))
         if t2 is None:
             t2 = t4
@@ -303,7 +555,7 @@ class Solar:
                 return s.julian_centuries_to_epoch(z) - s.julian_centuries_to_epoch(a)
         d12 = dur(t1, t2)
         d34 = dur(t3, t4)
-        (t1, t2, t3, t4) = tuple(Solar.__jc_to_str(x) if x is not None else None for x in (t1, t2, t3, t4))
+        (t1, t2, t3, t4) = tuple(self.__present(x) for x in (t1, t2, t3, t4))
         def strise(s):
             if format is None:
                 return int(s)
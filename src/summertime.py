@@ -5,9 +5,8 @@ def is_summer_time(days_offset = 0, check_time = '12:00:00'):
     '''
     Is summer time in effect during (most of) the selected day?
     
-    Assumes that there is, and only is, standard time and summer time.
-    Problems can occur if you for example also have double summer time
-    or if you have permanent summer time.
+    Double summer time counts as summer time, and so does
+    permanent summer time if the time zone database says so.
     
     @param   days_offset:int  The number of days into the future to check, 0 for today (local time)
     @param   check_time:str   The time of the day to check (current timezone), either in
@@ -15,30 +14,297 @@ def is_summer_time(days_offset = 0, check_time = '12:00:00'):
     @return  :(:bool, :date)  Whether summer time is in effect durning the day, and the selected date
     '''
     import time
-    check_time = ':'.join((check_time + ':00').split(':')[:3])
+    (hour, minute, second) = [int(x) for x in (check_time + ':00').split(':')[:3]]
     now = time.localtime()
-    (year, mon, mday) = now.tm_year, now.tm_mon, now.tm_mday + days_offset
-    feb = lambda y : 29 if y % 400 == 0 or y % 4 == 0 and not y % 100 == 0 else 28
-    DAYS_OF_MONTHS = [-1, 31, feb(year), 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-    while mday > DAYS_OF_MONTHS[mon]:
-        mday -= DAYS_OF_MONTHS[mon]
-        mon += 1
-        if mon > 12:
-            mon = 1
-            year += 1
-            DAYS_OF_MONTHS = [-1, 31, feb(year), 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-    while mday <= 0:
-        mon -= 1
-        if mon == 0:
-            mon = 12
-            year -= 1
-            DAYS_OF_MONTHS = [-1, 31, feb(year), 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-        mday += DAYS_OF_MONTHS[mon]
-    date = '%i-%02i-%02i' % (year, mon, mday)
-    check_time = '%s %s' % (date, check_time)
-    date = time.strptime(date, '%Y-%m-%d')
-    guessed = time.mktime(time.strptime(check_time, '%Y-%m-%d %H:%M:%S'))
-    for tzname, summer in zip(time.tzname, (False, True)):
-        if time.mktime(time.strptime('%s %s' % (check_time, tzname), '%Y-%m-%d %H:%M:%S %Z')) == guessed:
-            return (summer, date)
-    return (False, date)
+    t = time.mktime((now.tm_year, now.tm_mon, now.tm_mday + days_offset, hour, minute, second, 0, 0, -1))
+    date = time.strptime(time.strftime('%Y-%m-%d', time.localtime(t)), '%Y-%m-%d')
+    return (TimeZone.local().is_dst(t), date)
+
+
+def summer_time_events(inclusion_period = 30, count = None):
+    '''
+    Get the switches between standard time and summer time, or other
+    changes of the UTC offset, in a format `events.filter_events` returns
+    
+    Like `is_summer_time`, the days are compared at noon, so a switch
+    is included if it happens after noon today but before noon on the
+    last day of the inclusion period.
+    
+    @param   inclusion_period:int           The number of days, after today, to look for switches in
+    @param   count:int?                     The maximum number of switches, `None` for all
+    @return  :list<(str, int, struct_time)>  The description of each switch, the number of days
+                                            until it, and its date (local time); chronologically
+    '''
+    import time
+    now = time.localtime()
+    today = time.mktime((now.tm_year, now.tm_mon, now.tm_mday, 0, 0, 0, 0, 0, -1))
+    start = time.mktime((now.tm_year, now.tm_mon, now.tm_mday, 12, 0, 0, 0, 0, -1))
+    end = time.mktime((now.tm_year, now.tm_mon, now.tm_mday + inclusion_period, 12, 0, 0, 0, 0, -1))
+    rc = []
+    for t, (old_offset, old_dst, _), (new_offset, new_dst, _) in TimeZone.local().transitions(start, end - start, count):
+        if new_dst and old_dst:
+            text = 'double summer time' if new_offset > old_offset else 'summer time'
+        elif new_dst:
+            text = 'summer time'
+        else:
+            text = 'standard time' if old_dst else 'new standard time'
+        date = time.strptime(time.strftime('%Y-%m-%d', time.localtime(t)), '%Y-%m-%d')
+        days = round((time.mktime(date) - today) / (24 * 60 * 60))
+        rc.append(('Switch to %s' % text, days, date))
+    return rc
+
+
+class TimeZone:
+    '''
+    The UTC offsets of a time zone, and when they change
+    
+    Each type of local time is a (UTC offset in seconds, whether
+    it is summer time, abbreviation)-tuple. The transitions are
+    read from a TZif file, and transitions after the last one in
+    the file are calculated, as needed, from the POSIX TZ string
+    at the end of the file.
+    '''
+    
+    def __init__(self, times, types, initial, rule = None):
+        '''
+        Constructor
+        
+        @param  times:list<int>                 The POSIX times of the transitions, sorted
+        @param  types:list<(int, bool, str)>    The local time types that begin at the transitions
+        @param  initial:(int, bool, str)        The local time type before the first transition
+        @param  rule:((int, bool, str), (int, bool, str), rule, rule)?
+                                                The parsed POSIX TZ string, see `parse_tz_string`,
+                                                for the times after the last transition
+        '''
+        import time
+        self.times, self.types, self.initial, self.rule = list(times), list(types), initial, rule
+        self.next_year = time.gmtime(self.times[-1]).tm_year if len(self.times) > 0 else 1970
+    
+    
+    @staticmethod
+    def local():
+        '''
+        Get the local time zone, as selected by $TZ
+        
+        @return  :TimeZone  The time zone
+        '''
+        import os
+        tz = os.environ.get('TZ', None)
+        if tz not in time_zones:
+            time_zones[tz] = TimeZone.lookup(tz)
+        return time_zones[tz]
+    
+    
+    @staticmethod
+    def lookup(tz):
+        '''
+        Get a time zone by its value for $TZ
+        
+        @param   tz:str?    The name of the time zone, the pathname of its
+                            TZif file, a POSIX TZ string, or `None` for the
+                            system's time zone
+        @return  :TimeZone  The time zone, UTC if it cannot be found
+        '''
+        import os
+        if tz is None:
+            filenames = ['/etc/localtime']
+        else:
+            tz = tz[1:] if tz.startswith(':') else tz
+            if tz.startswith('/'):
+                filenames = [tz]
+            elif tz == '' or '..' in tz.split('/'):
+                filenames = []
+            else:
+                dirs = [os.environ.get('TZDIR', ''), '/usr/share/zoneinfo', '/usr/lib/zoneinfo', '/usr/share/lib/zoneinfo']
+                filenames = ['%s/%s' % (d, tz) for d in dirs if d != '']
+        for filename in filenames:
+            try:
+                return TimeZone.load(filename)
+            except:
+                pass
+        rule = None if tz is None or tz == '' else parse_tz_string(tz)
+        if rule is None:
+            return TimeZone([], [], (0, False, 'UTC'))
+        return TimeZone([], [], rule[0], rule)
+    
+    
+    @staticmethod
+    def load(filename):
+        '''
+        Read a TZif file
+        
+        @param   filename:str  The pathname of the file
+        @return  :TimeZone     The time zone
+        '''
+        import struct
+        with open(filename, 'rb') as file:
+            data = file.read()
+        def header(offset):
+            if data[offset : offset + 4] != b'TZif':
+                raise Exception('%s is not a TZif file' % filename)
+            return (data[offset + 4],) + struct.unpack('>6l', data[offset + 20 : offset + 44])
+        version, isutcnt, isstdcnt, leapcnt, timecnt, typecnt, charcnt = header(0)
+        offset, size = 44, 4
+        if version >= ord('2'):
+            offset += timecnt * 5 + typecnt * 6 + charcnt + leapcnt * 8 + isstdcnt + isutcnt
+            _, isutcnt, isstdcnt, leapcnt, timecnt, typecnt, charcnt = header(offset)
+            offset, size = offset + 44, 8
+        times = struct.unpack('>%i%s' % (timecnt, 'lq'[size // 8]), data[offset : offset + timecnt * size])
+        offset += timecnt * size
+        indices = data[offset : offset + timecnt]
+        offset += timecnt
+        ttinfos = [struct.unpack('>lBB', data[offset + 6 * i : offset + 6 * i + 6]) for i in range(typecnt)]
+        offset += typecnt * 6
+        chars = data[offset : offset + charcnt]
+        offset += charcnt + leapcnt * (size + 4) + isstdcnt + isutcnt
+        abbr = lambda i : chars[i : chars.index(b'\0', i)].decode('utf-8', 'replace')
+        types = [(utoff, bool(isdst), abbr(i)) for utoff, isdst, i in ttinfos]
+        rule = None
+        if version >= ord('2'):
+            footer = data[offset:].decode('utf-8', 'replace').split('\n')
+            if len(footer) >= 3 and footer[1] != '':
+                rule = parse_tz_string(footer[1])
+        return TimeZone(times, [types[i] for i in indices], types[0], rule)
+    
+    
+    def extend(self, t):
+        '''
+        Calculate the transitions, from the POSIX TZ string,
+        up to at least a point in time
+        
+        @param  t:int  The POSIX time
+        '''
+        import time
+        if self.rule is None or self.rule[1] is None:
+            return
+        std, dst, start, end = self.rule
+        year = time.gmtime(max(min(t, 1 << 40), -(1 << 40))).tm_year
+        while self.next_year <= year + 1:
+            switches = [(rule_time(start, self.next_year, std[0]), dst),
+                        (rule_time(end, self.next_year, dst[0]), std)]
+            for when, tztype in sorted(switches, key = lambda x : x[0]):
+                if len(self.times) == 0 or when > self.times[-1]:
+                    self.times.append(when)
+                    self.types.append(tztype)
+            self.next_year += 1
+    
+    
+    def type_at(self, t = None):
+        '''
+        Get the type of local time in effect at a point in time
+        
+        @param   t:int?              The POSIX time, `None` for now
+        @return  :(int, bool, str)   The UTC offset in seconds, whether it is
+                                     summer time, and the abbreviation
+        '''
+        import bisect, time
+        t = time.time() if t is None else t
+        self.extend(t)
+        i = bisect.bisect_right(self.times, t) - 1
+        return self.initial if i < 0 else self.types[i]
+    
+    
+    def is_dst(self, t = None):
+        '''
+        Is summer time in effect at a point in time?
+        
+        @param   t:int?  The POSIX time, `None` for now
+        @return  :bool   Whether summer time is in effect
+        '''
+        return self.type_at(t)[1]
+    
+    
+    def transitions(self, after = None, horizon = 366 * 24 * 60 * 60, count = None):
+        '''
+        Get the coming changes of the UTC offset or of summer time
+        
+        @param   after:int?                       The POSIX time to start at, `None` for now
+        @param   horizon:int                      The number of seconds, after `after`, to look in
+        @param   count:int?                       The maximum number of transitions, `None` for all
+        @return  :list<(int, (int, bool, str), (int, bool, str))>
+                                                  For each transition: its POSIX time, the type
+                                                  of local time before it, and after it
+        '''
+        import bisect, time
+        after = time.time() if after is None else after
+        self.extend(after + horizon)
+        rc = []
+        i = bisect.bisect_right(self.times, after)
+        old = self.initial if i == 0 else self.types[i - 1]
+        while i < len(self.times) and self.times[i] <= after + horizon and (count is None or len(rc) < count):
+            new = self.types[i]
+            if new[:2] != old[:2]:
+                rc.append((self.times[i], old, new))
+            old, i = new, i + 1
+        return rc
+
+
+def parse_tz_string(tz):
+    '''
+    Parse a POSIX TZ string, such as 'CET-1CEST,M3.5.0,M10.5.0/3'
+    
+    @param   tz:str  The string
+    @return  :((int, bool, str), (int, bool, str)?, rule?, rule?)?
+                     The standard time and summer time types, as in `TimeZone`, and
+                     the rules for when summer time starts and ends, `None` if summer
+                     time is not used, or `None` if the string cannot be parsed; a rule is
+                     ('J', day, seconds), ('', day, seconds), or ('M', month, week, weekday, seconds)
+    '''
+    import re
+    name = r'(<[^>]*>|[A-Za-z]{3,})'
+    offset = r'([+-]?\d{1,3}(?::\d{1,2}){0,2})'
+    rule = r'(J\d{1,3}|\d{1,3}|M\d{1,2}\.\d\.\d)(?:/' + offset + r')?'
+    match = re.fullmatch(name + offset + r'(?:' + name + offset + r'?(?:,' + rule + r',' + rule + r')?)?', tz)
+    if match is None:
+        return None
+    std_name, std_offset, dst_name, dst_offset, start, start_time, end, end_time = match.groups()
+    def seconds(text, default):
+        if text is None:
+            return default
+        sign = -1 if text.startswith('-') else 1
+        parts = [int(x) for x in text.lstrip('+-').split(':')] + [0, 0]
+        return sign * (parts[0] * 3600 + parts[1] * 60 + parts[2])
+    def parse_rule(text, at):
+        at = seconds(at, 2 * 3600)
+        if text.startswith('J'):
+            return ('J', int(text[1:]), at)
+        if text.startswith('M'):
+            return ('M',) + tuple(int(x) for x in text[1:].split('.')) + (at,)
+        return ('', int(text), at)
+    std = (-seconds(std_offset, 0), False, std_name.strip('<>'))
+    if dst_name is None:
+        return (std, None, None, None)
+    dst = (-seconds(dst_offset, -std[0] - 3600), True, dst_name.strip('<>'))
+    if start is None:
+        start, end = 'M3.2.0', 'M11.1.0'
+    return (std, dst, parse_rule(start, start_time), parse_rule(end, end_time))
+
+
+def rule_time(rule, year, utoff):
+    '''
+    Get the POSIX time at which a rule in a POSIX TZ string takes effect
+    
+    @param   rule:rule   The rule, see `parse_tz_string`
+    @param   year:int    The year
+    @param   utoff:int   The UTC offset, in seconds, in effect before the rule takes effect
+    @return  :int        The POSIX time
+    '''
+    import calendar
+    leap = calendar.isleap(year)
+    if rule[0] == 'J':
+        day = rule[1] - 1 + (1 if leap and rule[1] > 59 else 0)
+        at = rule[2]
+    elif rule[0] == '':
+        day, at = rule[1], rule[2]
+    else:
+        _, month, week, weekday, at = rule
+        first = (calendar.weekday(year, month, 1) + 1) % 7
+        mday = 1 + (weekday - first) % 7 + (week - 1) * 7
+        while mday > calendar.monthrange(year, month)[1]:
+            mday -= 7
+        day = (calendar.timegm((year, month, mday, 0, 0, 0)) - calendar.timegm((year, 1, 1, 0, 0, 0))) // 86400
+    return calendar.timegm((year, 1, 1, 0, 0, 0)) + day * 86400 + at - utoff
+
+
+# Loaded time zones, by the value of $TZ
+time_zones = {}
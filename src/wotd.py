@@ -1,20 +1,233 @@
 # -*- python -*-
 # See LICENSE file for copyright and license details.
 
-def wotd(lang = 'en', abort_timer = 2):
+WOTD_URLS = { 'en' : 'https://en.wiktionary.org/wiki/Wiktionary:Word_of_the_day'
+            , 'sv' : 'https://sv.wiktionary.org/wiki/Wiktionary:Huvudsida'
+            }
+
+# How long each word is shown: strftime format of the period
+WOTD_PERIODS = { 'en' : '%Y-%m-%d'  # word of the day
+               , 'sv' : '%G-W%V'    # word of the week
+               }
+
+def wotd(lang = 'en', abort_timer = 2, ttl = 60 * 60):
     '''
     Get Wiktionary's word of the day
     
+    The word is cached in $XDG_CACHE_HOME/rotd/wotd until the
+    day, or for Swedish the ISO week, is over, so the page is
+    only downloaded and parsed once per period
+    
     @param   lang:str         The language code. Supported languages codes:
                                 en  English (word of the day)
                                 sv  Swedish (word of the week)
     @param   abort_timer:int  The number of seconds before giving up
-    @return  :str?            The word of the day, in LaTeX, `None` on error
+    @param   ttl:int?         The number of seconds a downloaded copy of the
+                              page may be used before it is revalidated
+    @return  :str?            The word of the day, in the markup of `latex.backend`,
+                              `None` on error
     '''
-    from __main__ import spawn, LIBEXEC
     try:
-        text = spawn('%s/rotd-wotd-%s' % (LIBEXEC, lang), abort_timer = abort_timer, get_stdout = True)
-        text = text.decode('utf-8', 'strict')
-        return text
+        return wotd_markup(wotd_latex(lang, abort_timer, ttl))
     except:
         return None
+
+
+def wotd_latex(lang = 'en', abort_timer = 2, ttl = 60 * 60):
+    '''
+    Get Wiktionary's word of the day, in LaTeX, regardless of `latex.backend`
+    
+    This is what is cached, and what is shared between the reports in
+    batch mode, so that reports in different formats can share it
+    
+    @param   lang:str         The language code, see `wotd`
+    @param   abort_timer:int  The number of seconds before giving up
+    @param   ttl:int?         See `wotd`
+    @return  :str             The word of the day, in LaTeX, an exception
+                              is raised on error
+    '''
+    from __main__ import cachedir
+    from net import fetch
+    import os, time, json, threading
+    period = time.strftime(WOTD_PERIODS[lang], time.localtime())
+    cache = '%s/%s.json' % (cachedir('wotd'), lang)
+    try:
+        with open(cache, 'rb') as file:
+            cached = json.loads(file.read().decode('utf-8', 'strict'))
+        if cached['period'] == period:
+            return cached['text']
+    except:
+        pass
+    page = fetch(WOTD_URLS[lang], ttl = ttl, abort_timer = abort_timer)
+    text = WOTD_EXTRACTORS[lang](page.decode('utf-8', 'strict'))
+    temp = '%s~%i.%i' % (cache, os.getpid(), threading.get_ident())
+    try:
+        with open(temp, 'wb') as file:
+            file.write(json.dumps({ 'period' : period, 'text' : text }).encode('utf-8'))
+            file.flush()
+        os.rename(temp, cache)
+    except OSError:
+        pass
+    return text
+
+
+def wotd_en(page):
+    '''
+    Extract the word of the day from English Wiktionary's Word of the day page
+    
+    The page is sliced line by line, in the same way as the
+    shell pipeline that was previously used
+    
+    @param   page:str  The page, in HTML
+    @return  :str      The word of the day, in LaTeX
+    '''
+    import re
+    lines = page.split('\n')
+    lines = trim(lines[find(lines, 'mf-wotd') + 1:])
+    lines = trim(lines[1 : find(lines, '</table>')])
+    lines = trim(lines[:find(lines, '<tr>')] + lines[find(lines, '</tr>') + 1:])
+    lines = trim(lines[:rfind(lines, '<tr>')] + lines[rfind(lines, '</tr>') + 1:])
+    lines = trim([re.sub(r'< *img[^>]*>', '', re.sub(r'< *a [^>]*>|</a>', '', line)) for line in lines[1:]])
+    word = '\n'.join(line for line in lines if 'id="WOTD-rss-title"' in line)
+    word = strip_tags(word.replace('<i>', '(').replace('</i>', ')'))
+    lines = trim(lines[find(lines, '<ol>') + 1 : find(lines, '</ol>')])
+    lines = trim(re.sub(r'</?small>', '\n\\g<0>\n', '\n'.join(lines)).split('\n'))
+    small = [i for i, line in enumerate(lines) if '<small>' in line]
+    if len(small) > 0:
+        lines = trim(lines[:small[-1]] + lines[rfind(lines, '</small>') + 1:])
+    lines = trim([strip_tags(line) for line in list_items(lines)])
+    word = word.replace(' (', '} (\\textsl{').replace(')', '})')
+    return '\\textbf{%s\n\\begin{itemize}\n%s\n\\end{itemize}\n' % (word, '\n'.join(lines))
+
+
+def wotd_sv(page):
+    '''
+    Extract the word of the week from Swedish Wiktionary's main page
+    
+    The page is sliced line by line, in the same way as the
+    shell pipeline that was previously used
+    
+    @param   page:str  The page, in HTML
+    @return  :str      The word of the week, in LaTeX
+    '''
+    lines = page.split('\n')
+    lines = trim(lines[find(lines, 'id="Veckans_ord"') + 1:])
+    word = strip_tags(lines[find(lines, '<big>')])
+    lines = trim(lines[find(lines, '<big>') + 1:])
+    wordclass = strip_tags(lines[find(lines, 'Ordklass:') + 1])
+    lines = trim(lines[find(lines, 'Definition:') + 1:])
+    lines = trim(lines[find(lines, '<ol>') + 1 : find(lines, '</ol>')])
+    lines = trim([strip_tags(line) for line in list_items(lines)])
+    return '\\textbf{%s} (\\textsl{%s})\n\\begin{itemize}\n%s\n\\end{itemize}\n' % (word, wordclass, '\n'.join(lines))
+
+
+WOTD_EXTRACTORS = { 'en' : wotd_en
+                  , 'sv' : wotd_sv
+                  }
+
+
+def wotd_markup(text):
+    '''
+    Convert a word of the day, as extracted by `wotd_en` or `wotd_sv`,
+    from LaTeX to the markup of `latex.backend`
+    
+    The extractors, and the cache, always use LaTeX, so that the
+    cache can be shared by reports in different formats
+    
+    @param   text:str  The word of the day, in LaTeX
+    @return  :str      The word of the day, in the backend's markup
+    '''
+    import latex, re, html
+    if latex.backend == 'latex':
+        return text
+    convert = lambda x : latex.escape(html.unescape(x))
+    lines = text.rstrip('\n').split('\n')
+    head = re.match(r'\\textbf\{([^}]*)\}?(?: \(\\textsl\{([^}]*)\}\))?(.*)$', lines[0])
+    word = latex.bf(convert(head.group(1)), '')
+    if head.group(2) is not None:
+        word += ' (%s)' % latex.sl(convert(head.group(2)), '')
+    word += convert(head.group(3))
+    items = []
+    for line in lines[lines.index('\\begin{itemize}') + 1 : lines.index('\\end{itemize}')]:
+        if line == '\\item':
+            items.append([])
+        elif len(items) > 0:
+            items[-1].append(line.strip())
+    items = ''.join(latex.item(convert(' '.join(item))) for item in items)
+    return '%s\n%s%s%s\n' % (word, latex.begin('itemize'), items, latex.end('itemize'))
+
+
+def find(lines, text):
+    '''
+    Get the index of the first line that contains a string
+    
+    @param   lines:list<str>  The lines
+    @param   text:str         The string
+    @return  :int             The index of the line, ValueError is
+                              raised if no line contains the string
+    '''
+    for i, line in enumerate(lines):
+        if text in line:
+            return i
+    raise ValueError('%s not found' % text)
+
+
+def rfind(lines, text):
+    '''
+    Get the index of the last line that contains a string
+    
+    @param   lines:list<str>  The lines
+    @param   text:str         The string
+    @return  :int             The index of the line, ValueError is
+                              raised if no line contains the string
+    '''
+    return len(lines) - 1 - find(lines[::-1], text)
+
+
+def trim(lines):
+    '''
+    Remove empty lines from the end, as the shell's
+    command substitution does
+    
+    @param   lines:list<str>  The lines
+    @return  :list<str>       The lines without trailing empty lines
+    '''
+    while len(lines) > 0 and lines[-1] == '':
+        lines = lines[:-1]
+    return lines
+
+
+def strip_tags(text):
+    '''
+    Remove all HTML tags that begin and end on the same line
+    
+    @param   text:str  The text
+    @return  :str      The text without tags
+    '''
+    import re
+    return re.sub(r'<[^>]*>', '', text)
+
+
+def list_items(lines):
+    '''
+    Convert the items of an HTML list into \\item:s, and remove blank lines
+    
+    @param   lines:list<str>  The lines of the list
+    @return  :list<str>       The converted lines
+    '''
+    import re
+    lines = [re.sub(r'<br */>', '', line).replace('</li>', '').replace('<li>', '\\item\n') for line in lines]
+    return [line for line in '\n'.join(lines).split('\n') if line.strip(' ') != '']
+
+
+def wotd_async(lang = 'en', abort_timer = 2, ttl = 60 * 60):
+    '''
+    Start `wotd` in the background
+    
+    @param   lang:str         The language code, see `wotd`
+    @param   abort_timer:int  The number of seconds before giving up
+    @param   ttl:int?         See `wotd`
+    @return  :Future<str?>    The future return value of `wotd`
+    '''
+    from __main__ import defer
+    return defer(wotd, lang = lang, abort_timer = abort_timer, ttl = ttl)
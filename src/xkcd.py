@@ -1,12 +1,16 @@
 # -*- python -*-
 # See LICENSE file for copyright and license details.
 
-def xkcd(index = None, abort_timer = 2):
+def xkcd(index = None, abort_timer = 2, ttl = 60 * 60):
     '''
     Get XKCD comic
     
     @param   index:int?       The index comic, `None` for the last one
     @param   abort_timer:int  The number of seconds to wait before giving up
+    @param   ttl:int?         The number of seconds a downloaded copy of the
+                              information about the last comic may be used
+                              before it is revalidated, information about
+                              specific comics is never revalidated
     @return  :(index:int, img:str, title:str, text:str)
                               Information about the comic
                                 index: The index of the fetched comic
@@ -15,34 +19,190 @@ def xkcd(index = None, abort_timer = 2):
                                 text:  The text that appears when in the comic's
                                        tool tip text on the web page
     '''
-    from __main__ import spawn
-    import html
+    from net import fetch
+    import json, urllib.parse
     url = 'https://xkcd.com/'
     if index is not None:
         url += str(index) + '/'
-    page = spawn('curl', url, abort_timer = abort_timer, get_stdout = True)
-    page = page.decode('utf-8', 'strict').split('\n')
+    info = fetch(url + 'info.0.json', ttl = ttl if index is None else None, abort_timer = abort_timer)
+    info = json.loads(info.decode('utf-8', 'strict'))
+    img = urllib.parse.urljoin(url, info['img'])
+    return (int(info['num']), img, info['title'], info['alt'])
+
+
+class SeenComics:
+    '''
+    The set of comics that have been shown
+    
+    The set is stored as a bitmap: bit `i % 8` (least significant
+    bit first) of byte `i // 8` is set if comic `i` has been shown.
+    Comics that do not exist are always marked as shown, so that
+    the first unshown comic is found by skipping the leading
+    0xFF bytes.
+    '''
+    
+    def __init__(self, filename = None):
+        '''
+        Constructor, the set is loaded from its file
+        
+        @param  filename:str?  The file the set is stored in, `None`
+                               for ~/.var/lib/rotd/xkcd.seen
+        '''
+        import os
+        self.filename = SeenComics.default_file() if filename is None else filename
+        self.bits = bytearray()
+        try:
+            with open(self.filename, 'rb') as file:
+                self.bits = bytearray(file.read())
+        except FileNotFoundError:
+            old = self.filename[:-len('.seen')] if self.filename.endswith('.seen') else None
+            if old is not None and os.path.exists(old):
+                self.migrate(old)
+        for i in MISSING_COMICS:
+            self.add(i)
+    
+    
+    @staticmethod
+    def default_file():
+        '''
+        Get the default file to store the set in
+        
+        @return  :str  ~/.var/lib/rotd/xkcd.seen, the directory is created if missing
+        '''
+        import os, pwd
+        home = os.environ.get('HOME', '')
+        state = (home if home.startswith('/') else pwd.getpwuid(os.getuid()).pw_dir) + '/.var/lib/rotd'
+        os.makedirs(state, exist_ok = True)
+        return state + '/xkcd.seen'
+    
+    
+    def migrate(self, filename):
+        '''
+        Add the comics from a file in the old format, a Python set
+        literal, and remove the file once the set has been saved
+        
+        @param  filename:str  The file in the old format
+        '''
+        import os, ast
+        with open(filename, 'rb') as file:
+            text = file.read().decode('utf-8', 'strict').strip()
+        for i in (set() if text == 'set()' else ast.literal_eval(text)):
+            self.add(int(i))
+        self.save()
+        os.unlink(filename)
+    
+    
+    def __contains__(self, i):
+        '''
+        Has a comic been shown?
+        
+        @param   i:int  The index of the comic
+        @return  :bool  Whether the comic has been shown
+        '''
+        return i // 8 < len(self.bits) and (self.bits[i // 8] >> (i % 8)) & 1 == 1
+    
+    
+    def add(self, i):
+        '''
+        Mark a comic as shown, call `save` to store the change
+        
+        @param  i:int  The index of the comic
+        '''
+        if i // 8 >= len(self.bits):
+            self.bits += bytes(i // 8 + 1 - len(self.bits))
+        self.bits[i // 8] |= 1 << (i % 8)
+    
+    
+    def next_unseen(self, last):
+        '''
+        Select the comic to show next
+        
+        @param   last:int  The index of the last comic
+        @return  :int?     `last` if it has not been shown, otherwise the first
+                           comic that has not been shown, `None` if all have
+        '''
+        if last not in self:
+            return last
+        i = (len(self.bits) - len(self.bits.lstrip(b'\xff'))) * 8
+        while i < last and i in self:
+            i += 1
+        return i if i < last else None
+    
+    
+    def save(self):
+        '''
+        Store the set, the file is replaced atomically
+        '''
+        import os, threading
+        temp = '%s~%i.%i' % (self.filename, os.getpid(), threading.get_ident())
+        with open(temp, 'wb') as file:
+            file.write(self.bits)
+            file.flush()
+        os.rename(temp, self.filename)
+
+
+# Comics that do not exist
+MISSING_COMICS = (0, 404)
+
+
+def next_comic(filename = None, abort_timer = 2, ttl = 60 * 60):
+    '''
+    Select the comic to show, download its image, and mark it as shown
+    
+    The comic is only marked as shown once its image has been
+    downloaded; the image is stored in the HTTP response cache,
+    so `fetch(img, ttl = None, output = ...)` will not download
+    it again. In batch mode this is called once, before the reports are
+    generated, so all reports show the same comic and the set
+    of shown comics is only saved once
+    
+    @param   filename:str?    The file the set of shown comics is stored in,
+                              `None` for ~/.var/lib/rotd/xkcd.seen
+    @param   abort_timer:int  The number of seconds to wait before giving up
+    @param   ttl:int?         See `xkcd`
+    @return  :(index:int, img:str, title:str, text:str)?
+                              Information about the comic, see `xkcd`,
+                              `None` if all comics have been shown
+    '''
+    from net import fetch
+    comic = xkcd(abort_timer = abort_timer, ttl = ttl)
+    seen = SeenComics(filename)
+    index = seen.next_unseen(comic[0])
     if index is None:
-        [index, _] = [line for line in page if '<a ' in line and 'rel="prev"' in line]
-        [index] = [word for word in index.split(' ') if word.startswith('href="/')]
-        index = int(''.join(c for c in index if c in '0123456789')) + 1
-    [n] = [i for i, line in enumerate(page) if 'id="comic"' in line]
-    page = [line for line in page[n:] if '<img ' in line][0]
-    page = ' '.join((page[:-2] + ' ').split(' ')[1:])
-    page = page.split('" ')
-    attrs = [attr.split('="') for attr in page[:-1]]
-    attrs = dict((key, html.unescape(value)) for [key, value] in attrs)
-    img = attrs['src']
-    if img.startswith('//'):
-        img = 'https:' + img
-    elif img.startswith('/'):
-        img = 'https://xkcd.com' + img
-    else:
-        while url.endswith('/'):
-            url = url[:-1]
-        proto, url = url.split('//')[0], '//'.join(url.split('//')[1:])
-        domain, url = url.split('/')[0], '/'.join(url.split('/')[1 : -1])
-        if len(url) > 0:
-            url = url + '/'
-        img = '%s//%s/%s%s' % (proto, domain, url, img)
-    return (index, img, attrs['alt'], attrs['title'])
+        return None
+    if index != comic[0]:
+        comic = xkcd(index, abort_timer = abort_timer)
+    fetch(comic[1], ttl = None, abort_timer = abort_timer)
+    seen.add(comic[0])
+    seen.save()
+    return comic
+
+
+def xkcd_async(index = None, abort_timer = 2, ttl = 60 * 60):
+    '''
+    Start `xkcd` in the background
+    
+    @param   index:int?       The index comic, `None` for the last one
+    @param   abort_timer:int  The number of seconds to wait before giving up
+    @param   ttl:int?         See `xkcd`
+    @return  :Future<(index:int, img:str, title:str, text:str)>
+                              The future return value of `xkcd`, its `result`
+                              method will raise the exception `xkcd` raised
+    '''
+    from __main__ import defer
+    return defer(xkcd, index = index, abort_timer = abort_timer, ttl = ttl)
+
+
+def next_comic_async(filename = None, abort_timer = 2, ttl = 60 * 60):
+    '''
+    Start `next_comic` in the background
+    
+    @param   filename:str?    See `next_comic`
+    @param   abort_timer:int  The number of seconds to wait before giving up
+    @param   ttl:int?         See `xkcd`
+    @return  :Future<(index:int, img:str, title:str, text:str)?>
+                              The future return value of `next_comic`, its `result`
+                              method will raise the exception `next_comic` raised
+    '''
+    from __main__ import defer
+    return defer(next_comic, filename = filename, abort_timer = abort_timer, ttl = ttl)